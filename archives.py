@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import io
+import os
+import time
+import zipfile
+import threading
+from collections import OrderedDict
+
+from config import ARCHIVE_EXTENSIONS
+
+# Zip archives as read-only virtual folders. A font inside an archive has the
+# path it would have if the archive were unpacked in place, e.g.
+# ~/fonts/Vendor.zip/otf/Sans-Bold.otf, so listings, the index and search can
+# treat it like any other file. Nothing is extracted to disk: the central
+# directory is read once per archive version and kept as a tree, and members are
+# only read when a font is opened, through a bounded byte cache.
+
+LISTING_CACHE_SIZE = 16                  # archives kept open with their tree
+MEMBER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_lock = threading.Lock()
+_listings = OrderedDict()    # archive path -> _Listing
+_members = OrderedDict()     # (archive path, mtime, member) -> bytes
+_member_bytes = 0
+
+
+class _Listing:
+    # The central directory of one archive as dirs: member dir -> (subdirs, files),
+    # with files as {name: (size, mtime)}. The zip stays open for reading members.
+
+    def __init__(self, path, size, mtime):
+        self.size = size
+        self.mtime = mtime
+        self.zip = zipfile.ZipFile(path)
+        self.lock = threading.Lock()
+        self.dirs = {"": ([], {})}
+        for info in self.zip.infolist():
+            name = info.filename.rstrip("/")
+            if not name or name.startswith("__MACOSX"):
+                continue
+            parts = name.split("/")
+            for depth in range(1, len(parts) if not info.is_dir() else len(parts) + 1):
+                self._add_dir("/".join(parts[:depth]))
+            if not info.is_dir():
+                parent = "/".join(parts[:-1])
+                self.dirs[parent][1][parts[-1]] = (info.file_size, time.mktime(info.date_time + (0, 0, -1)))
+        for subdirs, _ in self.dirs.values():
+            subdirs.sort(key=str.lower)
+
+    def _add_dir(self, member_dir):
+        if member_dir in self.dirs:
+            return
+        parent, _, name = member_dir.rpartition("/")
+        self._add_dir(parent)
+        self.dirs[parent][0].append(name)
+        self.dirs[member_dir] = ([], {})
+
+    def read(self, member):
+        with self.lock:
+            return self.zip.read(member)
+
+    def close(self):
+        self.zip.close()
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def split(path):
+    # (archive path, member path) for a path inside an archive, member "" for
+    # the archive itself; None for an ordinary path
+    path = os.path.normpath(path)
+    lower = path.lower()
+    for ext in ARCHIVE_EXTENSIONS:
+        pos = lower.find(ext + os.sep)
+        while pos != -1:
+            archive = path[:pos + len(ext)]
+            if os.path.isfile(archive):
+                return archive, path[pos + len(ext) + 1:].replace(os.sep, "/")
+            pos = lower.find(ext + os.sep, pos + 1)
+    if is_archive(path) and os.path.isfile(path):
+        return path, ""
+    return None
+
+
+def _listing(archive):
+    # Raises OSError for a missing or broken archive
+    st = os.stat(archive)
+    with _lock:
+        listing = _listings.get(archive)
+        if listing is not None and (listing.size, listing.mtime) == (st.st_size, st.st_mtime):
+            _listings.move_to_end(archive)
+            return listing
+    try:
+        listing = _Listing(archive, st.st_size, st.st_mtime)
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, ValueError, OverflowError) as e:
+        raise OSError(f"Bad archive {archive}: {e}")
+    with _lock:
+        old = _listings.pop(archive, None)
+        _listings[archive] = listing
+        while len(_listings) > LISTING_CACHE_SIZE:
+            _listings.popitem(last=False)[1].close()
+    if old is not None:
+        old.close()
+    return listing
+
+
+def getmtime(path):
+    # Modification time of a file or folder; a path inside an archive has the
+    # archive's, so anything cached by it is dropped when the archive changes
+    parts = split(path)
+    return os.stat(parts[0] if parts else path).st_mtime
+
+
+def stat(path):
+    # (size, mtime) of a font file, inside an archive or not. Raises OSError.
+    parts = split(path)
+    if parts is None:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime
+    member_dir, _, name = parts[1].rpartition("/")
+    entry = _listing(parts[0]).dirs.get(member_dir)
+    if entry is None or name not in entry[1]:
+        raise FileNotFoundError(f"No file {parts[1]} in {parts[0]}")
+    return entry[1][name]
+
+
+def list_dir(path):
+    # (subdirs, {file name: (size, mtime)}) of the archive or archive folder at path
+    archive, member = split(path) or (path, "")
+    entry = _listing(archive).dirs.get(member)
+    if entry is None:
+        raise FileNotFoundError(f"No folder {member} in {archive}")
+    return list(entry[0]), dict(entry[1])
+
+
+def walk(path):
+    # Like os.walk, for the archive or archive folder at path
+    stack = [path]
+    while stack:
+        folder = stack.pop()
+        try:
+            subdirs, files = list_dir(folder)
+        except OSError:
+            continue
+        yield folder, subdirs, list(files)
+        stack.extend(os.path.join(folder, name) for name in reversed(subdirs))
+
+
+def read_member(path, cache=True):
+    # Bytes of the font at path inside an archive. Raises OSError.
+    global _member_bytes
+    archive, member = split(path) or (path, "")
+    listing = _listing(archive)
+    key = (archive, listing.mtime, member)
+    with _lock:
+        data = _members.get(key)
+        if data is not None:
+            _members.move_to_end(key)
+            return data
+    try:
+        data = listing.read(member)
+    except (KeyError, zipfile.BadZipFile, ValueError) as e:
+        raise OSError(f"Cannot read {member} from {archive}: {e}")
+    if cache and len(data) <= MEMBER_CACHE_MAX_BYTES:
+        with _lock:
+            if key not in _members:
+                _members[key] = data
+                _member_bytes += len(data)
+            while _member_bytes > MEMBER_CACHE_MAX_BYTES:
+                _member_bytes -= len(_members.popitem(last=False)[1])
+    return data
+
+
+def read_bytes(path, cache=True):
+    # Whole contents of a font file, inside an archive or not
+    if split(path):
+        return read_member(path, cache)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def open_file(path, cache=True):
+    # A binary file object for a font file; a member is read into memory through
+    # the member cache, so reopening the selected font does not inflate it again
+    if split(path):
+        return io.BytesIO(read_member(path, cache))
+    return open(path, "rb")
+
+
+def stats():
+    with _lock:
+        return {"archives": len(_listings), "members": len(_members), "bytes": _member_bytes}
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import random
+import struct
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SYSTEM_FONT_PATH
+
+# Builds a synthetic font collection out of a few real fonts. Every file gets its
+# own name table, with the family and style its file name claims, so contents,
+# hashes and search results differ like in a real collection; a small share are
+# exact copies of an earlier file, for duplicate detection. The same seed and
+# arguments always give the same tree, file names, formats and contents, so
+# results from different commits can be compared.
+#
+#   flat   all fonts in a handful of big folders
+#   deep   a tree of `fanout` folders per level, `depth` levels deep
+#   mixed  a bit of both, like a real collection that grew over the years
+
+SHAPES = ("flat", "deep", "mixed")
+FAMILY_WORDS = (
+    "alder", "basalt", "cedar", "delta", "ember", "fjord", "garnet", "harbor", "indigo", "juniper",
+    "kestrel", "lumen", "meridian", "nimbus", "onyx", "pioneer", "quartz", "raven", "sierra", "tundra",
+    "umber", "vesper", "willow", "xenon", "yarrow", "zephyr",
+)
+CLASS_WORDS = ("sans", "serif", "mono", "slab", "display", "script", "grotesk", "text")
+STYLE_WORDS = ("Regular", "Bold", "Italic", "BoldItalic", "Light", "Medium", "Black", "Condensed")
+MANIFEST_NAME = "collection.json"
+
+
+def find_source_fonts(count, search_dir=SYSTEM_FONT_PATH):
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(search_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith((".ttf", ".otf")):
+                sources.append(os.path.join(dirpath, name))
+    random.Random(0).shuffle(sources)
+    return sorted(sources[:count])
+
+
+def _sfnt_tables(data):
+    # (tag, checksum, offset, length) of a single-font sfnt
+    num_tables = struct.unpack_from(">H", data, 4)[0]
+    return [struct.unpack_from(">4sIII", data, 12 + 16 * i) for i in range(num_tables)]
+
+
+def _checksum(data):
+    data += b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+def _name_table(family, style, unique_id):
+    # A format 0 name table with Windows Unicode records only
+    strings = ((1, family), (2, style), (3, unique_id), (4, f"{family} {style}"),
+               (6, f"{family}-{style}".replace(" ", "")))
+    records = bytearray()
+    storage = bytearray()
+    for name_id, text in strings:
+        encoded = text.encode("utf-16-be")
+        records += struct.pack(">6H", 3, 1, 0x409, name_id, len(encoded), len(storage))
+        storage += encoded
+    return struct.pack(">3H", 0, len(strings), 6 + len(records)) + bytes(records) + bytes(storage)
+
+
+def rename_font(data, family, style, unique_id):
+    # Rewrites a single-font sfnt with a new name table, table checksums and
+    # head checksum adjustment
+    tables = {tag: bytearray(data[offset:offset + length])
+              for tag, _, offset, length in _sfnt_tables(data)}
+    tables[b"name"] = bytearray(_name_table(family, style, unique_id))
+    if b"head" in tables:
+        struct.pack_into(">I", tables[b"head"], 8, 0)
+
+    tags = sorted(tables)
+    power = 1 << (len(tags).bit_length() - 1)
+    out = bytearray(data[:4] + struct.pack(">HHHH", len(tags), power * 16, power.bit_length() - 1,
+                                             (len(tags) - power) * 16))
+    pos = 12 + 16 * len(tags)
+    for tag in tags:
+        out += struct.pack(">4sIII", tag, _checksum(bytes(tables[tag])), pos, len(tables[tag]))
+        pos += (len(tables[tag]) + 3) & ~3
+    head_offset = None
+    for tag in tags:
+        if tag == b"head":
+            head_offset = len(out)
+        out += tables[tag]
+        out += b"\0" * (-len(out) % 4)
+    if head_offset is not None:
+        struct.pack_into(">I", out, head_offset + 8, (0xB1B0AFBA - _checksum(bytes(out))) & 0xFFFFFFFF)
+    return bytes(out)
+
+
+def build_ttc(font_datas):
+    # Packs sfnt fonts into a TrueType collection. Each font is copied whole and
+    # its table offsets are moved by where the font starts in the collection.
+    header_size = 12 + 4 * len(font_datas)
+    offsets = []
+    pos = header_size
+    for data in font_datas:
+        offsets.append(pos)
+        pos += (len(data) + 3) & ~3
+
+    out = bytearray(struct.pack(">4sII", b"ttcf", 0x00010000, len(font_datas)))
+    out += struct.pack(f">{len(offsets)}I", *offsets)
+    for base, data in zip(offsets, font_datas):
+        font = bytearray(data)
+        for i, (tag, checksum, offset, length) in enumerate(_sfnt_tables(data)):
+            struct.pack_into(">4sIII", font, 12 + 16 * i, tag, checksum, offset + base, length)
+        out += font
+        out += b"\0" * (((len(font) + 3) & ~3) - len(font))
+    return bytes(out)
+
+
+def _directories(shape, fonts, depth, fanout, rng):
+    # Relative folders the fonts are spread over
+    if shape == "flat":
+        return [f"folder-{i:02d}" for i in range(max(1, fonts // 2000))]
+
+    tree = [""]
+    level = [""]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"{rng.choice(FAMILY_WORDS)}-{i}") for parent in level
+                 for i in range(fanout)]
+        tree.extend(level)
+        if len(tree) > fonts:
+            break
+    if shape == "deep":
+        return tree
+    return tree[:max(1, len(tree) // 4)] + [f"inbox-{i}" for i in range(2)]
+
+
+def generate(dest, fonts=2000, shape="mixed", depth=3, fanout=6, ttc_share=0.05,
+             sources=None, seed=0, duplicate_share=0.02):
+    # Writes the collection under dest and returns its manifest
+    rng = random.Random(seed)
+    sources = sources or find_source_fonts(8)
+    if not sources:
+        raise ValueError(f"No source fonts found in {SYSTEM_FONT_PATH}, pass some with --source")
+
+    os.makedirs(dest, exist_ok=True)
+    if os.listdir(dest):
+        raise ValueError(f"{dest} is not empty")
+
+    datas = {}
+    for src in sources:
+        with open(src, "rb") as f:
+            datas[src] = f.read()
+    ttc_sources = [s for s in sources[:4] if datas[s][:4] != b"OTTO"] or sources[:1]
+
+    dirs = _directories(shape, fonts, depth, fanout, rng)
+    for rel in dirs:
+        os.makedirs(os.path.join(dest, rel), exist_ok=True)
+
+    names = []
+    counts = {".ttf": 0, ".otf": 0, ".ttc": 0}
+    duplicates = 0
+    for i in range(fonts):
+        rel_dir = rng.choice(dirs)
+        family = f"{rng.choice(FAMILY_WORDS).capitalize()} {rng.choice(CLASS_WORDS).capitalize()}"
+        style = rng.choice(STYLE_WORDS)
+        stem = f"{family.replace(' ', '')}-{style}-{i:05d}"
+        if names and rng.random() < duplicate_share:
+            original = rng.choice(names)
+            rel_path = os.path.join(rel_dir, stem + os.path.splitext(original)[1])
+            with open(os.path.join(dest, original), "rb") as f:
+                data = f.read()
+            duplicates += 1
+        elif rng.random() < ttc_share:
+            rel_path = os.path.join(rel_dir, stem + ".ttc")
+            data = build_ttc([rename_font(datas[s], family, STYLE_WORDS[j % len(STYLE_WORDS)],
+                                          f"{stem};{j}")
+                              for j, s in enumerate(ttc_sources)])
+        else:
+            src = rng.choice(sources)
+            ext = ".otf" if datas[src][:4] == b"OTTO" else ".ttf"
+            rel_path = os.path.join(rel_dir, stem + ext)
+            data = rename_font(datas[src], family, style, stem)
+        with open(os.path.join(dest, rel_path), "wb") as f:
+            f.write(data)
+        names.append(rel_path)
+        counts[os.path.splitext(rel_path)[1]] += 1
+
+    manifest = {
+        "fonts": fonts, "shape": shape, "depth": depth, "fanout": fanout, "ttc_share": ttc_share,
+        "seed": seed, "directories": len(dirs), "formats": counts, "duplicates": duplicates,
+        "sources": [os.path.basename(s) for s in sources],
+        "largest_directory": Counter(os.path.dirname(n) for n in names).most_common(1)[0][0],
+        "deepest_directory": max(dirs, key=lambda d: (d.count(os.sep), d)),
+        "sample": sorted(rng.sample(names, min(50, len(names)))),
+    }
+    with open(os.path.join(dest, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Generate a synthetic font collection.")
+    parser.add_argument("dest")
+    parser.add_argument("--fonts", type=int, default=2000)
+    parser.add_argument("--shape", choices=SHAPES, default="mixed")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--ttc-share", type=float, default=0.05, help="fraction of .ttc files")
+    parser.add_argument("--source", action="append", help="real font to copy (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-share", type=float, default=0.02,
+                        help="fraction of files that are exact copies of another")
+    args = parser.parse_args(argv)
+
+    manifest = generate(args.dest, args.fonts, args.shape, args.depth, args.fanout, args.ttc_share,
+                        args.source, args.seed, args.duplicate_share)
+    print(json.dumps({k: v for k, v in manifest.items() if k != "sample"}, indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
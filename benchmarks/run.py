@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import random
+import fnmatch
+import argparse
+import platform
+import tempfile
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tracing import rss_mb
+
+# Times the viewer's hot paths on a synthetic collection, with the offscreen Qt
+# platform and a private cache and config directory, and writes the results as
+# JSON. Thresholds (thresholds.json) and an optional baseline from an earlier
+# run flag regressions; the exit status is 1 if anything was flagged.
+#
+#   python benchmarks/run.py --fonts 5000 --shape deep --out results.json
+#   python benchmarks/run.py --collection ~/fonts --baseline results.json
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+QUERIES = ("s", "se", "ser", "seri", "serif", "sans bold", "quartz grotesk bold")
+ZOOM_LEVELS = (50, 100, 150, 200)
+WAIT_TIMEOUT_MS = 120000
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(samples):
+    ms = [s * 1000 for s in samples]
+    return {"runs": len(ms), "min_ms": round(min(ms), 3), "median_ms": round(percentile(ms, 0.5), 3),
+            "p95_ms": round(percentile(ms, 0.95), 3)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def wait_for(signal, predicate, action=None, pending=None, timeout_ms=WAIT_TIMEOUT_MS):
+    # Runs action and spins an event loop until signal fires with arguments
+    # that satisfy predicate, unless pending() says that action finished
+    # synchronously. Returns False on timeout.
+    from PyQt5.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    hit = []
+
+    def on_signal(*args):
+        if predicate(*args):
+            hit.append(args)
+            loop.quit()
+
+    timer = QTimer()
+    timer.setSingleShot(True)
+    timer.timeout.connect(loop.quit)
+    signal.connect(on_signal)
+    try:
+        if action is not None:
+            action()
+        if pending is not None and not pending():
+            return True
+        if not hit:
+            timer.start(timeout_ms)
+            loop.exec_()
+    finally:
+        timer.stop()
+        signal.disconnect(on_signal)
+    return bool(hit)
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def time(self, name, fn, repeat=None, setup=None):
+        samples = []
+        for i in range(repeat or self.repeat):
+            if setup is not None:
+                setup(i)
+            start = time.perf_counter()
+            fn(i)
+            samples.append(time.perf_counter() - start)
+        self.results[name] = summarize(samples)
+        print(f"{name:40s} {self.results[name]['median_ms']:10.2f} ms", file=sys.stderr)
+
+
+def bench_index(bench, root):
+    from config import FONT_EXTENSIONS
+    from font_index import FontIndex
+    from font_meta import MetadataExtractor
+
+    def build(_):
+        index = FontIndex(root, FONT_EXTENSIONS)
+        index.refresh()
+        extractor = MetadataExtractor()
+        try:
+            index.extract_metadata(index.pending_metadata(), extractor)
+        finally:
+            extractor.shutdown()
+
+    def reset(_):
+        db_path = FontIndex(root, FONT_EXTENSIONS).db_path
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    bench.time("index.build", build, repeat=1, setup=reset)
+
+    def refresh(_):
+        index = FontIndex(root, FONT_EXTENSIONS)
+        index.load()
+        index.refresh()
+
+    bench.time("index.load_and_refresh_unchanged", refresh)
+
+
+def bench_viewer(bench, root, manifest, memory_fonts, memory_rounds):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    import viewer
+    viewer.ROOT_PATH = root
+    viewer.SINGLE_INSTANCE = False
+    sys.argv[1:] = []
+
+    holder = {}
+
+    def create(_):
+        holder["w"] = viewer.FontViewerApp()
+        holder["w"].show()
+
+    # The first index refresh is only requested once the event loop runs
+    bench.time("startup.window", create, repeat=1)
+    w = holder["w"]
+    if not wait_for(w.search_worker.index_refreshed, lambda changed: True):
+        print("Error: the index was not refreshed in time", file=sys.stderr)
+
+    # --- load_directory ---
+    def listing(path):
+        def run(_):
+            # A cached listing is shown synchronously and starts no scan
+            if not wait_for(w.dir_scanner.scan_finished,
+                            lambda generation, *args: generation == w.scan_generation,
+                            lambda: w.load_directory(path), lambda: w.scan_generation != 0):
+                print(f"Error: listing {path} timed out", file=sys.stderr)
+        return run
+
+    targets = {"root": "", "largest": manifest.get("largest_directory", ""),
+               "deepest": manifest.get("deepest_directory", "")}
+    for label, rel in targets.items():
+        path = os.path.join(root, rel) if rel else root
+        bench.time(f"load_directory.cold.{label}", listing(path), setup=lambda _: w.dir_cache.clear())
+        bench.time(f"load_directory.warm.{label}", listing(path))
+
+    # --- handle_search ---
+    def search(query):
+        def run(_):
+            w.search_text = query
+            wait_for(w.search_worker.search_finished,
+                     lambda generation, count: generation == w.search_generation, w.start_search)
+        return run
+
+    bench.time("search.first", search(QUERIES[0]), repeat=1)
+    for query in QUERIES:
+        bench.time(f"search.len{len(query)}", search(query))
+    w.search_text = ""
+    w.search_bar.clear()
+
+    # --- load_font_file ---
+    sample = [os.path.join(root, p) for p in manifest.get("sample", [])]
+    if not sample:
+        sample = [path for path, _, _ in w.font_index.iter_files()][:50]
+    runs = min(bench.repeat, len(sample))
+    bench.time("load_font_file.cold", lambda i: w.load_font_file(sample[i]), repeat=runs)
+    bench.time("load_font_file.warm", lambda i: w.load_font_file(sample[0]), repeat=runs)
+
+    # --- display_font ---
+    w.load_font_file(sample[0])
+    family = w.current_font_family
+    style = w.style_combo.currentText()
+
+    def display(_):
+        w.display_font(family, style)
+        w.canvas.document().size()
+        w.canvas.viewport().repaint()
+
+    def new_heading(i):
+        w.heading_text = f"{w.default_heading_text} {i}"
+
+    bench.time("display_font.new_document", display, setup=new_heading)
+    for zoom in ZOOM_LEVELS:
+        def set_zoom(i, zoom=zoom):
+            # Alternate, so every run really changes the zoom
+            w.zoom_level = zoom if i % 2 == 0 else zoom + 1
+        bench.time(f"display_font.zoom{zoom}", display, setup=set_zoom)
+
+    # --- Memory ---
+    files = sorted(path for path, _, _ in w.font_index.iter_files())
+    random.Random(0).shuffle(files)
+    files = files[:memory_fonts]
+    start = rss_mb()
+    rounds = []
+    for _ in range(memory_rounds):
+        for path in files:
+            w.load_font_file(path)
+            app.processEvents()
+        rounds.append(round(rss_mb(), 1))
+    memory = {"fonts": len(files), "rss_start_mb": round(start, 1), "rss_rounds_mb": rounds,
+              "growth_mb": round(rounds[-1] - rounds[0], 1) if rounds else 0.0,
+              "font_cache": w.font_cache.stats()}
+
+    w.close()
+    app.processEvents()
+    return memory
+
+
+def check(results, memory, collection, thresholds, baseline=None):
+    # Returns human-readable regressions
+    flags = []
+    values = dict(results)
+    values["memory"] = memory
+    for pattern, limits in thresholds.get("absolute", {}).items():
+        for name, result in values.items():
+            if not fnmatch.fnmatchcase(name, pattern):
+                continue
+            for stat, limit in limits.items():
+                if stat in result and result[stat] > limit:
+                    flags.append(f"{name}: {stat} {result[stat]} > {limit}")
+
+    if baseline and baseline.get("collection") != collection:
+        print("Baseline was measured on a different collection, not comparing", file=sys.stderr)
+    elif baseline:
+        tolerance = thresholds.get("regression", {}).get("tolerance", 1.5)
+        min_delta = thresholds.get("regression", {}).get("min_delta_ms", 5)
+        for name, result in results.items():
+            old = baseline.get("results", {}).get(name)
+            if not old:
+                continue
+            new_ms, old_ms = result["median_ms"], old["median_ms"]
+            if new_ms > old_ms * tolerance and new_ms - old_ms > min_delta:
+                flags.append(f"{name}: median {new_ms} ms vs {old_ms} ms in {baseline['meta'].get('commit')}")
+    return flags
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the font viewer on a synthetic collection.")
+    parser.add_argument("--collection", help="existing collection to use instead of generating one")
+    parser.add_argument("--fonts", type=int, default=2000)
+    parser.add_argument("--shape", default="mixed")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", action="append", help="real font to build from (repeatable)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--memory-fonts", type=int, default=300)
+    parser.add_argument("--memory-rounds", type=int, default=3)
+    parser.add_argument("--out", help="write the results here (default: stdout)")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="font-fragrance-bench-")
+    # Before anything reads them: the benchmark never touches the real cache or state
+    os.environ["XDG_CACHE_HOME"] = os.path.join(work_dir, "cache")
+    os.environ["XDG_CONFIG_HOME"] = os.path.join(work_dir, "config")
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+
+    import generate
+    if args.collection:
+        root = os.path.normpath(os.path.abspath(args.collection))
+        try:
+            with open(os.path.join(root, generate.MANIFEST_NAME), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+    else:
+        root = os.path.join(work_dir, "collection")
+        manifest = generate.generate(root, args.fonts, args.shape, args.depth, args.fanout,
+                                     sources=args.source, seed=args.seed)
+
+    bench = Bench(args.repeat)
+    bench_index(bench, root)
+    memory = bench_viewer(bench, root, manifest, args.memory_fonts, args.memory_rounds)
+
+    from PyQt5.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+    report = {
+        "meta": {"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "python": platform.python_version(), "qt": QT_VERSION_STR, "pyqt": PYQT_VERSION_STR,
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "repeat": args.repeat},
+        "collection": {k: v for k, v in manifest.items() if k != "sample"},
+        "results": bench.results,
+        "memory": memory,
+    }
+
+    try:
+        with open(args.thresholds, encoding="utf-8") as f:
+            thresholds = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading thresholds: {e}", file=sys.stderr)
+        thresholds = {}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report["regressions"] = check(bench.results, memory, report["collection"], thresholds, baseline)
+
+    text = json.dumps(report, indent=1)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for flag in report["regressions"]:
+        print(f"REGRESSION {flag}", file=sys.stderr)
+    return 1 if report["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import ROOT_PATH, FONT_EXTENSIONS
+from font_index import FontIndex
+import tracing
+
+# Headless commands for scripts and cron jobs. Only `render` imports PyQt5, for
+# the offscreen worker processes that draw the specimens.
+
+COMMANDS = ("index", "search", "render")
+METADATA_CHUNK = 256
+
+
+def cmd_index(args):
+    index = FontIndex(args.root, FONT_EXTENSIONS)
+    index.load()
+    changed = index.refresh()
+    print(f"{len(index)} fonts, {len(changed)} directories rescanned", file=sys.stderr)
+    if args.no_metadata:
+        return 0
+
+    from font_meta import MetadataExtractor
+    pending = index.pending_metadata()
+    extractor = MetadataExtractor(args.jobs)
+    try:
+        for start in range(0, len(pending), METADATA_CHUNK):
+            try:
+                index.extract_metadata(pending[start:start + METADATA_CHUNK], extractor)
+            except BrokenProcessPool:
+                # A worker died; a new pool is started for the next chunk
+                extractor.shutdown()
+            except Exception as e:
+                print(f"Error reading font metadata: {e}", file=sys.stderr)
+            print(f"Metadata: {min(start + METADATA_CHUNK, len(pending))}/{len(pending)}",
+                  file=sys.stderr)
+    finally:
+        extractor.shutdown()
+    return 0
+
+
+def cmd_search(args):
+    index = FontIndex(args.root, FONT_EXTENSIONS)
+    results = index.search_db(args.query, args.limit)
+    infos = index.load_info([rel_path for _, rel_path, _ in results])
+    for name, rel_path, score in results:
+        info = infos.get(rel_path) or {}
+        print(json.dumps({
+            "path": os.path.join(index.root_path, rel_path),
+            "name": name,
+            "score": round(score, 3),
+            "family": info.get("family"),
+            "subfamily": info.get("subfamily"),
+        }, ensure_ascii=False))
+    return 0
+
+
+def _render_sources(args):
+    sources = []
+    for path in args.fonts:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                sources.extend(os.path.join(dirpath, f) for f in sorted(filenames)
+                               if f.lower().endswith(FONT_EXTENSIONS))
+        else:
+            sources.append(path)
+    if args.query:
+        index = FontIndex(args.root, FONT_EXTENSIONS)
+        sources.extend(os.path.join(index.root_path, rel_path)
+                       for _, rel_path, _ in index.search_db(args.query, args.limit))
+    return sources
+
+
+def _output_names(sources, out_dir, extension):
+    # One output per font, named after the font file; clashes get a counter
+    names = {}
+    used = set()
+    for path in sources:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = stem
+        counter = 2
+        while name in used:
+            name = f"{stem}-{counter}"
+            counter += 1
+        used.add(name)
+        names[path] = os.path.join(out_dir, f"{name}.{extension}")
+    return names
+
+
+def cmd_render(args):
+    import specimen
+
+    sources = _render_sources(args)
+    if not sources:
+        print("Error: no fonts to render", file=sys.stderr)
+        return 1
+    outputs = _output_names(sources, args.out, args.format)
+
+    failed = 0
+    with ProcessPoolExecutor(args.jobs or os.cpu_count() or 1,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=specimen.init_export_worker) as executor:
+        futures = [(path, executor.submit(specimen.export_specimen, path, outputs[path], args.style,
+                                          args.heading, args.caps, args.zoom, args.width))
+                   for path in sources]
+        for path, future in futures:
+            try:
+                result = {"font": path, "output": future.result()}
+            except Exception as e:
+                result = {"font": path, "error": str(e)}
+                failed += 1
+            print(json.dumps(result, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="font-fragrance",
+                                     description="Index, search and export the font collection "
+                                                 "without starting the viewer.")
+    parser.add_argument("--root", default=ROOT_PATH, help="collection root (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("index", help="scan the collection and extract font metadata")
+    p.add_argument("--no-metadata", action="store_true", help="only list files")
+    p.add_argument("--jobs", type=int, default=None, help="worker processes")
+    p.set_defaults(func=cmd_index)
+
+    p = commands.add_parser("search", help="query the index, one JSON object per line")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=None)
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser("render", help="export specimens to PNG or PDF")
+    p.add_argument("fonts", nargs="*", help="font files or directories")
+    p.add_argument("--query", help="also render the fonts matching this search")
+    p.add_argument("--limit", type=int, default=None, help="maximum search results to render")
+    p.add_argument("--out", required=True, help="output directory")
+    p.add_argument("--format", choices=("png", "pdf"), default="png")
+    p.add_argument("--width", type=int, default=1200, help="page width in pixels")
+    p.add_argument("--zoom", type=int, default=100, help="heading zoom in percent")
+    p.add_argument("--style", default=None, help="style to render (default: the first one)")
+    p.add_argument("--heading", default=None, help="heading text")
+    p.add_argument("--caps", action="store_true", help="upper-case heading")
+    p.add_argument("--jobs", type=int, default=None, help="worker processes")
+    p.set_defaults(func=cmd_render)
+    return parser
+
+
+def main(argv):
+    args = build_parser().parse_args(argv)
+    if args.command == "render" and args.heading is None:
+        from specimen import DEFAULT_HEADING
+        args.heading = DEFAULT_HEADING
+    try:
+        with tracing.span(f"cli_{args.command}"):
+            return args.func(args)
+    finally:
+        tracing.export_on_exit()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+import os
+
+# --- Configuration ---
+ROOT_PATH = os.path.normpath("/home/prakriti/Documents/fontcollection")
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc', '.otc', '.woff', '.woff2')
+COLLECTION_EXTENSIONS = ('.ttc', '.otc')
+ARCHIVE_EXTENSIONS = ('.zip',)
+SYSTEM_FONT_PATH = "/usr/share/fonts"
+USER_FONT_PATHS = (os.path.expanduser("~/.local/share/fonts"), os.path.expanduser("~/.fonts"))
+
+# A second launch hands its fonts to the running viewer instead of starting another
+SINGLE_INSTANCE = True
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import archives
+from font_index import CACHE_DIR, FontIndex
+
+# Content hashes for install detection and duplicate finding. Files are first
+# compared by size, then by a partial hash of their head and tail, and only
+# files that still collide get a full hash. Every hash is cached by
+# (path, size, mtime), so no file is read twice across runs.
+
+HASH_DB_PATH = os.path.join(CACHE_DIR, "hashes.sqlite3")
+PARTIAL_CHUNK = 64 * 1024
+READ_SIZE = 1024 * 1024
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def _digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+def partial_hash(path, size):
+    # Head and tail of the file; for files that fit in both chunks this is the
+    # hash of the whole file, and is also used as its full hash
+    h = _digest()
+    h.update(size.to_bytes(8, "little"))
+    with archives.open_file(path, cache=False) as f:
+        if size <= 2 * PARTIAL_CHUNK:
+            h.update(f.read())
+        else:
+            h.update(f.read(PARTIAL_CHUNK))
+            f.seek(size - PARTIAL_CHUNK)
+            h.update(f.read(PARTIAL_CHUNK))
+    return h.hexdigest()
+
+
+def full_hash(path):
+    h = _digest()
+    with archives.open_file(path, cache=False) as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class HashCache:
+    # Thread-safe, persistent cache of partial and full hashes. Lookups and new
+    # hashes stay in memory; flush() writes the new ones in one transaction.
+
+    def __init__(self, db_path=HASH_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._entries = None     # path -> [size, mtime, partial, full]
+        self._dirty = set()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS hashes ("
+                     "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, "
+                     "partial TEXT, full TEXT)")
+        return conn
+
+    def _ensure_loaded(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            conn = self._connect()
+            try:
+                for path, size, mtime, partial, full in conn.execute(
+                        "SELECT path, size, mtime, partial, full FROM hashes"):
+                    self._entries[path] = [size, mtime, partial, full]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading hash cache: {e}")
+
+    def _entry(self, path, size, mtime):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != size or entry[1] != mtime:
+                entry = [size, mtime, None, None]
+                self._entries[path] = entry
+            return entry
+
+    def partial(self, path, size, mtime):
+        entry = self._entry(path, size, mtime)
+        if entry[2] is None:
+            value = partial_hash(path, size)
+            with self._lock:
+                entry[2] = value
+                if size <= 2 * PARTIAL_CHUNK:
+                    entry[3] = value
+                self._dirty.add(path)
+        return entry[2]
+
+    def full(self, path, size, mtime):
+        entry = self._entry(path, size, mtime)
+        if entry[3] is None:
+            if size <= 2 * PARTIAL_CHUNK:
+                return self.partial(path, size, mtime)
+            value = full_hash(path)
+            with self._lock:
+                entry[3] = value
+                self._dirty.add(path)
+        return entry[3]
+
+    def flush(self):
+        with self._lock:
+            rows = [(p, *self._entries[p]) for p in self._dirty if p in self._entries]
+            self._dirty = set()
+        if not rows:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO hashes (path, size, mtime, partial, full) "
+                                     "VALUES (?, ?, ?, ?, ?)", rows)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error writing hash cache: {e}")
+
+
+def _collisions(files, key, executor):
+    # files: [(path, size, mtime)]; groups them by key(file), computed in parallel,
+    # and returns only the groups with more than one member
+    groups = {}
+    keys = executor.map(lambda f: _safe(key, f), files)
+    for f, k in zip(files, keys):
+        if k is not None:
+            groups.setdefault(k, []).append(f)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def _safe(key, f):
+    try:
+        return key(f)
+    except OSError:
+        return None
+
+
+def find_duplicates(files, hash_cache, max_workers=HASH_WORKERS):
+    # files: iterable of (path, size, mtime). Returns lists of paths with the
+    # same content, biggest waste first.
+    by_size = {}
+    for f in files:
+        by_size.setdefault(f[1], []).append(f)
+    candidates = [f for group in by_size.values() if len(group) > 1 for f in group]
+
+    duplicates = []
+    with ThreadPoolExecutor(max_workers) as executor:
+        by_partial = _collisions(candidates, lambda f: (f[1], hash_cache.partial(*f)), executor)
+        for group in by_partial:
+            duplicates.extend(_collisions(group, lambda f: hash_cache.full(*f), executor))
+    hash_cache.flush()
+
+    duplicates.sort(key=lambda g: (-(len(g) - 1) * g[0][1], g[0][0]))
+    return [[f[0] for f in sorted(group)] for group in duplicates]
+
+
+class InstallIndex:
+    # Fonts installed in the system and user font directories, by content. Each
+    # directory tree is listed incrementally with a FontIndex; a font counts as
+    # installed when a file there has the same size and the same hash.
+
+    def __init__(self, font_dirs, extensions, hash_cache=None):
+        self.indexes = [FontIndex(d, extensions) for d in font_dirs]
+        self.hash_cache = hash_cache or HashCache()
+        self._lock = threading.Lock()
+        self._by_size = {}       # size -> [(path, mtime)]
+
+    def load(self):
+        for index in self.indexes:
+            index.load()
+        self._rebuild()
+
+    def refresh(self):
+        changed = False
+        for index in self.indexes:
+            if index.refresh():
+                changed = True
+        if changed or not self._by_size:
+            self._rebuild()
+        return changed
+
+    def _rebuild(self):
+        by_size = {}
+        for index in self.indexes:
+            for path, size, mtime in index.iter_files():
+                by_size.setdefault(size, []).append((path, mtime))
+        with self._lock:
+            self._by_size = by_size
+
+    def find_installed(self, path):
+        # Returns the installed copy of the font at path, or None
+        try:
+            size, mtime = archives.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            candidates = list(self._by_size.get(size, ()))
+        if not candidates:
+            return None
+
+        try:
+            source = (path, size, mtime)
+            for candidate_path, _ in candidates:
+                if os.path.normpath(candidate_path) == os.path.normpath(path):
+                    return candidate_path
+
+            wanted = self.hash_cache.partial(*source)
+            matches = [c for c in candidates
+                       if _safe(lambda f: self.hash_cache.partial(f[0], size, f[1]), c) == wanted]
+            if matches:
+                wanted = self.hash_cache.full(*source)
+                for candidate in matches:
+                    if _safe(lambda f: self.hash_cache.full(f[0], size, f[1]), candidate) == wanted:
+                        return candidate[0]
+            return None
+        except OSError:
+            return None
+        finally:
+            self.hash_cache.flush()
@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+import os
+import json
+import bisect
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+
+import archives
+import font_meta
+
+# --- Configuration ---
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                         "font-fragrance")
+INDEX_VERSION = 4
+
+# Score of a query term that hits a token in the given field
+FIELD_WEIGHTS = {
+    "family": 3.0, "full_name": 2.0, "subfamily": 2.0, "weight": 2.0, "width": 1.5,
+    "classes": 2.0, "scripts": 2.0, "designer": 1.0, "vendor": 1.0, "name": 1.5,
+}
+PREFIX_FACTOR = 0.6       # a term that is only a prefix of the token
+SUBSTRING_SCORE = 1.0     # a term found anywhere in the file name
+FUZZY_FACTOR = 0.5        # a term within a few typos of the token
+FUZZY_MIN_LENGTH = 4      # shorter terms are only matched exactly
+FUZZY_LONG_TERM = 8       # terms this long may have two typos instead of one
+GRAMS_PER_EDIT = 4        # trigrams one typo can change at most
+COMPACT_MIN_HOLES = 1024  # removed documents tolerated before a rebuild
+
+
+def default_index_path(root_path):
+    # One database per collection root, so switching ROOT_PATH never mixes entries
+    digest = hashlib.sha1(os.path.normpath(root_path).encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(CACHE_DIR, f"index-{digest[:16]}.sqlite3")
+
+
+def _is_under(rel, start):
+    return not start or rel == start or rel.startswith(start + os.sep)
+
+
+def _grams(word):
+    # Trigrams of a word, the first one marked, so word starts and words
+    # shorter than three characters are represented too
+    word = "$" + word
+    return {word[i:i + 3] for i in range(len(word) - 2)} or {word}
+
+
+def _distance(a, b, limit):
+    # Optimal string alignment distance (swapping two neighbours is one edit),
+    # or limit + 1 as soon as it is certain to be over limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _max_edits(term):
+    return 1 if len(term) < FUZZY_LONG_TERM else 2
+
+
+def _fuzzy_match(term, token):
+    # (edits, is_prefix) if token, or its start, is a few typos away from term
+    # without matching it exactly; None otherwise
+    limit = _max_edits(term)
+    edits = _distance(term, token, limit)
+    if 0 < edits <= limit:
+        return edits, False
+    if len(token) > len(term):
+        edits = _distance(term, token[:len(term)], limit)
+        if 0 < edits <= limit:
+            return edits, True
+    return None
+
+
+def _fuzzy_factor(term, edits, prefix):
+    return FUZZY_FACTOR * (1 - edits / len(term)) * (PREFIX_FACTOR if prefix else 1.0)
+
+
+def _raise_scores(scores, doc_ids, score):
+    # scores[d] = max(scores.get(d, 0), score) for every d in doc_ids, with the
+    # new ids added in one go
+    new = doc_ids.difference(scores)
+    if len(new) < len(doc_ids):
+        for doc_id in doc_ids - new:
+            if scores[doc_id] < score:
+                scores[doc_id] = score
+    scores.update(dict.fromkeys(new, score))
+
+
+def _document_tokens(lower_name, info):
+    # token -> best field weight, for one file name and its metadata
+    fields = {"name": os.path.splitext(lower_name)[0]}
+    if info:
+        fields.update(font_meta.search_fields(info))
+    tokens = {}
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for token in font_meta.tokenize(text):
+            if tokens.get(token, 0) < weight:
+                tokens[token] = weight
+    return tokens
+
+
+class FontIndex:
+    # Persistent index of the font files under a collection root.
+    #
+    # Directories are keyed by their mtime: a directory is only listed again when
+    # its mtime differs from the stored one, so a refresh of an unchanged tree costs
+    # one stat per directory. Files are stored with their size and mtime. Searches
+    # are answered from the in-memory copy and never touch the disk.
+    #
+    # Zip archives are indexed like folders (see archives.py); every folder inside
+    # an archive carries the archive's mtime, so they are all listed again from
+    # the cached central directory when the archive changes.
+    #
+    # Font metadata (names, weight, width, scripts...) is extracted separately
+    # in a process pool and feeds an inverted index used for ranked queries.
+    # The tokens are stored as well, so search_db() can answer a query straight
+    # from the database without loading the whole index (used by the CLI).
+    #
+    # The in-memory search index is built on the first query and then updated
+    # in place as directories are rescanned and metadata comes in. Documents
+    # have stable ids; a trigram index over the token vocabulary finds tokens
+    # containing a term (substrings of file names) and tokens a few typos away.
+
+    def __init__(self, root_path, extensions, db_path=None):
+        self.root_path = os.path.normpath(root_path)
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.db_path = db_path or default_index_path(self.root_path)
+
+        self.dir_mtimes = {}    # rel dir -> mtime
+        self.dir_subdirs = {}   # rel dir -> [subdir names]
+        self.dir_files = {}     # rel dir -> {file name: (size, mtime)}
+        self.file_meta = {}     # rel path -> (size, mtime, info dict or None)
+
+        self._lock = threading.Lock()
+        self._docs = None           # doc id -> (lower name, name, rel path), None once removed
+        self._doc_ids = {}          # rel path -> doc id
+        self._doc_tokens = {}       # doc id -> {token: weight}
+        self._postings = {}         # token -> {weight: {doc ids}}
+        self._name_postings = {}    # file name token -> {doc ids}
+        self._tokens = []           # sorted tokens of _postings, for prefix lookups
+        self._gram_tokens = {}      # trigram -> {tokens of either vocabulary}
+
+    # --- Storage ---
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(INDEX_VERSION):
+            conn.execute("DROP TABLE IF EXISTS dirs")
+            conn.execute("DROP TABLE IF EXISTS files")
+            conn.execute("DROP TABLE IF EXISTS fontmeta")
+            conn.execute("DROP TABLE IF EXISTS tokens")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                         (str(INDEX_VERSION),))
+        conn.execute("CREATE TABLE IF NOT EXISTS dirs ("
+                     "path TEXT PRIMARY KEY, mtime REAL NOT NULL, subdirs TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS files ("
+                     "dir TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL, "
+                     "mtime REAL NOT NULL, PRIMARY KEY (dir, name))")
+        conn.execute("CREATE TABLE IF NOT EXISTS fontmeta ("
+                     "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, info TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS tokens ("
+                     "token TEXT NOT NULL, path TEXT NOT NULL, weight REAL NOT NULL, "
+                     "PRIMARY KEY (token, path)) WITHOUT ROWID")
+        conn.execute("CREATE INDEX IF NOT EXISTS tokens_path ON tokens (path)")
+        conn.commit()
+        return conn
+
+    def load(self):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error opening font index: {e}")
+            return
+
+        dir_mtimes = {}
+        dir_subdirs = {}
+        dir_files = {}
+        file_meta = {}
+        try:
+            for path, mtime, subdirs in conn.execute("SELECT path, mtime, subdirs FROM dirs"):
+                dir_mtimes[path] = mtime
+                dir_subdirs[path] = subdirs.split("\0") if subdirs else []
+                dir_files[path] = {}
+            for d, name, size, mtime in conn.execute("SELECT dir, name, size, mtime FROM files"):
+                dir_files.setdefault(d, {})[name] = (size, mtime)
+            for path, size, mtime, info in conn.execute("SELECT path, size, mtime, info FROM fontmeta"):
+                file_meta[path] = (size, mtime, json.loads(info) if info else None)
+        except sqlite3.Error as e:
+            print(f"Error reading font index: {e}")
+            return
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.dir_mtimes = dir_mtimes
+            self.dir_subdirs = dir_subdirs
+            self.dir_files = dir_files
+            self.file_meta = file_meta
+            self._invalidate()
+
+    def _invalidate(self):
+        # The search index is built again on the next query
+        self._docs = None
+
+    def _save(self, changed, removed, stale_meta=()):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error opening font index: {e}")
+            return
+
+        try:
+            with conn:
+                for rel in removed:
+                    conn.execute("DELETE FROM dirs WHERE path = ?", (rel,))
+                    conn.execute("DELETE FROM files WHERE dir = ?", (rel,))
+                for rel, (mtime, subdirs, files) in changed.items():
+                    conn.execute("INSERT OR REPLACE INTO dirs (path, mtime, subdirs) VALUES (?, ?, ?)",
+                                 (rel, mtime, "\0".join(subdirs)))
+                    conn.execute("DELETE FROM files WHERE dir = ?", (rel,))
+                    conn.executemany("INSERT INTO files (dir, name, size, mtime) VALUES (?, ?, ?, ?)",
+                                     [(rel, name, size, f_mtime)
+                                      for name, (size, f_mtime) in files.items()])
+                conn.executemany("DELETE FROM fontmeta WHERE path = ?", [(p,) for p in stale_meta])
+                conn.executemany("DELETE FROM tokens WHERE path = ?", [(p,) for p in stale_meta])
+        except sqlite3.Error as e:
+            print(f"Error writing font index: {e}")
+        finally:
+            conn.close()
+
+    # --- Scanning ---
+    def _scan_dir(self, abs_path):
+        if archives.split(abs_path):
+            subdirs, files = archives.list_dir(abs_path)
+            return subdirs, {name: stat for name, stat in files.items()
+                             if name.lower().endswith(self.extensions)}
+        subdirs = []
+        files = {}
+        with os.scandir(abs_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir() or archives.is_archive(entry.name):
+                        subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(self.extensions):
+                        st = entry.stat()
+                        files[entry.name] = (st.st_size, st.st_mtime)
+                except OSError:
+                    continue
+        subdirs.sort(key=str.lower)
+        return subdirs, files
+
+    def refresh(self, rel_dirs=None):
+        # Walks the stored directory tree and only lists directories whose mtime
+        # changed. With rel_dirs, only those subtrees are walked and the given
+        # directories are always listed again, since a file modified in place does
+        # not change its directory's mtime. Returns the set of relative
+        # directories that were rescanned or removed.
+        starts = [""] if rel_dirs is None else sorted(set(rel_dirs))
+        forced = set() if rel_dirs is None else set(starts)
+        with self._lock:
+            known_mtimes = dict(self.dir_mtimes)
+            known_subdirs = dict(self.dir_subdirs)
+
+        changed = {}
+        seen = set()
+        stack = list(starts)
+        while stack:
+            rel = stack.pop()
+            abs_path = os.path.join(self.root_path, rel) if rel else self.root_path
+            try:
+                mtime = archives.getmtime(abs_path)
+            except OSError:
+                continue
+            seen.add(rel)
+
+            if rel not in forced and known_mtimes.get(rel) == mtime:
+                subdirs = known_subdirs.get(rel, [])
+            else:
+                try:
+                    subdirs, files = self._scan_dir(abs_path)
+                except OSError:
+                    continue
+                changed[rel] = (mtime, subdirs, files)
+
+            for name in subdirs:
+                stack.append(os.path.join(rel, name) if rel else name)
+
+        if rel_dirs is None:
+            removed = set(known_mtimes) - seen
+        else:
+            removed = {rel for rel in known_mtimes
+                       if any(_is_under(rel, start) for start in starts)} - seen
+        if not changed and not removed:
+            return set()
+
+        with self._lock:
+            old_paths = {os.path.join(rel, name) if rel else name
+                         for rel in removed | set(changed) for name in self.dir_files.get(rel, ())}
+            for rel in removed:
+                self.dir_mtimes.pop(rel, None)
+                self.dir_subdirs.pop(rel, None)
+                self.dir_files.pop(rel, None)
+            for rel, (mtime, subdirs, files) in changed.items():
+                self.dir_mtimes[rel] = mtime
+                self.dir_subdirs[rel] = subdirs
+                self.dir_files[rel] = files
+            new_paths = {os.path.join(rel, name) if rel else name
+                         for rel, (_, _, files) in changed.items() for name in files}
+            current = set(self._iter_paths())
+            stale_meta = [p for p in self.file_meta if p not in current]
+            for p in stale_meta:
+                del self.file_meta[p]
+            self._update_search(old_paths - new_paths, new_paths - old_paths)
+
+        self._save(changed, removed, stale_meta)
+        return set(changed) | removed
+
+    def _iter_paths(self):
+        for rel_dir, files in self.dir_files.items():
+            for name in files:
+                yield os.path.join(rel_dir, name) if rel_dir else name
+
+    # --- Metadata ---
+    def pending_metadata(self):
+        # Relative paths whose metadata is missing or older than the file
+        pending = []
+        with self._lock:
+            for rel_dir, files in self.dir_files.items():
+                for name, (size, mtime) in files.items():
+                    rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                    meta = self.file_meta.get(rel_path)
+                    if meta is None or meta[0] != size or meta[1] != mtime:
+                        pending.append(rel_path)
+        pending.sort()
+        return pending
+
+    def extract_metadata(self, rel_paths, extractor):
+        results = extractor.extract([os.path.join(self.root_path, p) for p in rel_paths])
+        rows = []
+        token_rows = []
+        with self._lock:
+            for rel_path, (_, info) in zip(rel_paths, results):
+                rel_dir, name = os.path.split(rel_path)
+                stat = self.dir_files.get(rel_dir, {}).get(name)
+                if stat is None:
+                    continue
+                self.file_meta[rel_path] = (stat[0], stat[1], info)
+                rows.append((rel_path, stat[0], stat[1], json.dumps(info) if info else None))
+                token_rows.extend((token, rel_path, weight)
+                                  for token, weight in _document_tokens(name.lower(), info).items())
+            updated = [row[0] for row in rows]
+            self._update_search(updated, updated)
+
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error opening font index: {e}")
+            return
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO fontmeta (path, size, mtime, info) "
+                                 "VALUES (?, ?, ?, ?)", rows)
+                conn.executemany("DELETE FROM tokens WHERE path = ?", [(row[0],) for row in rows])
+                conn.executemany("INSERT INTO tokens (token, path, weight) VALUES (?, ?, ?)",
+                                 token_rows)
+        except sqlite3.Error as e:
+            print(f"Error writing font index: {e}")
+        finally:
+            conn.close()
+
+    def iter_files(self):
+        # (absolute path, size, mtime) of every indexed file
+        with self._lock:
+            dirs = list(self.dir_files.items())
+        for rel_dir, files in dirs:
+            base = os.path.join(self.root_path, rel_dir) if rel_dir else self.root_path
+            for name, (size, mtime) in list(files.items()):
+                yield os.path.join(base, name), size, mtime
+
+    def directories(self):
+        # Real folders only, archives cannot be watched from the inside
+        with self._lock:
+            rels = list(self.dir_mtimes)
+        return [os.path.join(self.root_path, rel) if rel else self.root_path
+                for rel in rels if not archives.split(os.path.join(self.root_path, rel))]
+
+    def info(self, rel_path):
+        meta = self.file_meta.get(rel_path)
+        return meta[2] if meta else None
+
+    # --- Queries ---
+    def _build(self):
+        self._docs = []
+        self._doc_ids = {}
+        self._doc_tokens = {}
+        self._postings = {}
+        self._name_postings = {}
+        self._gram_tokens = {}
+        # Ids follow the names, so ties in a ranking sort by id; files added
+        # later come after the others until the next build
+        paths = sorted(self._iter_paths(), key=lambda p: (os.path.basename(p).lower(), p))
+        for rel_path in paths:
+            self._add_doc(rel_path, keep_sorted=False)
+        self._tokens = sorted(self._postings)
+
+    def _update_search(self, removed, added):
+        # Keeps a built search index in step with the files, with the lock held
+        if self._docs is None:
+            return
+        for rel_path in removed:
+            self._remove_doc(rel_path)
+        for rel_path in added:
+            self._add_doc(rel_path)
+        # Removed documents leave holes in the id space
+        if len(self._docs) > 2 * len(self._doc_ids) + COMPACT_MIN_HOLES:
+            self._invalidate()
+
+    def _add_doc(self, rel_path, keep_sorted=True):
+        name = os.path.basename(rel_path)
+        lower_name = name.lower()
+        doc_id = len(self._docs)
+        self._docs.append((lower_name, name, rel_path))
+        self._doc_ids[rel_path] = doc_id
+        meta = self.file_meta.get(rel_path)
+        tokens = _document_tokens(lower_name, meta and meta[2])
+        self._doc_tokens[doc_id] = tokens
+        for token, weight in tokens.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                self._add_grams(token)
+                if keep_sorted:
+                    bisect.insort(self._tokens, token)
+            posting.setdefault(weight, set()).add(doc_id)
+        # The whole name, extension included, for substring matches
+        for token in font_meta.tokenize(lower_name):
+            doc_ids = self._name_postings.get(token)
+            if doc_ids is None:
+                doc_ids = self._name_postings[token] = set()
+                self._add_grams(token)
+            doc_ids.add(doc_id)
+
+    def _remove_doc(self, rel_path):
+        doc_id = self._doc_ids.pop(rel_path, None)
+        if doc_id is None:
+            return
+        lower_name = self._docs[doc_id][0]
+        self._docs[doc_id] = None
+        for token, weight in self._doc_tokens.pop(doc_id).items():
+            posting = self._postings[token]
+            posting[weight].discard(doc_id)
+            if not posting[weight]:
+                del posting[weight]
+            if not posting:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+                self._drop_grams(token)
+        for token in font_meta.tokenize(lower_name):
+            doc_ids = self._name_postings.get(token)
+            if doc_ids is None:
+                continue
+            doc_ids.discard(doc_id)
+            if not doc_ids:
+                del self._name_postings[token]
+                self._drop_grams(token)
+
+    def _add_grams(self, token):
+        for gram in _grams(token):
+            self._gram_tokens.setdefault(gram, set()).add(token)
+
+    def _drop_grams(self, token):
+        if token in self._postings or token in self._name_postings:
+            return
+        for gram in _grams(token):
+            tokens = self._gram_tokens.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._gram_tokens[gram]
+
+    def _name_tokens_containing(self, term):
+        if len(term) < 3:
+            return [token for token in self._name_postings if term in token]
+        # Every token containing term has all of its trigrams, so the rarest
+        # one gives the fewest candidates
+        candidates = min((self._gram_tokens.get(term[i:i + 3], ()) for i in range(len(term) - 2)),
+                         key=len)
+        return [token for token in candidates if term in token and token in self._name_postings]
+
+    def _fuzzy_tokens(self, term):
+        # (token, edits, is_prefix) for tokens a few typos away from term. An
+        # edit changes at most four trigrams (swapping two letters), which rules
+        # out most tokens before any distance is computed.
+        grams = _grams(term)
+        shared = {}
+        for gram in grams:
+            for token in self._gram_tokens.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        needed = len(grams) - GRAMS_PER_EDIT * _max_edits(term)
+        for token, count in shared.items():
+            if count < needed or token not in self._postings:
+                continue
+            match = _fuzzy_match(term, token)
+            if match is not None:
+                yield (token,) + match
+
+    def _term_scores(self, term):
+        # doc id -> best score of one query term, with the lock held
+        scores = {}
+        tokens = self._tokens
+        pos = first = bisect.bisect_left(tokens, term)
+        while pos < len(tokens) and tokens[pos].startswith(term):
+            token = tokens[pos]
+            factor = 1.0 if token == term else PREFIX_FACTOR
+            for weight, doc_ids in self._postings[token].items():
+                _raise_scores(scores, doc_ids, weight * factor)
+            pos += 1
+        for token in self._name_tokens_containing(term):
+            scores.update(dict.fromkeys(self._name_postings[token].difference(scores), SUBSTRING_SCORE))
+        # Typos are only looked for once no token starts with the term, so
+        # correctly typed words never pull in look-alikes
+        if pos == first and len(term) >= FUZZY_MIN_LENGTH:
+            for token, edits, prefix in self._fuzzy_tokens(term):
+                factor = _fuzzy_factor(term, edits, prefix)
+                for weight, doc_ids in self._postings[token].items():
+                    _raise_scores(scores, doc_ids, weight * factor)
+        return scores
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(files) for files in self.dir_files.values())
+
+    def search(self, text, limit=None):
+        # Ranked multi-term query over file names and font metadata. Every term
+        # has to match, as a (prefix of a) token, inside the file name or, from
+        # four letters on, with a typo or two. Yields (name, rel_path), best
+        # matches first; with limit, only the best limit of them.
+        terms = font_meta.tokenize(text)
+        if not terms:
+            return
+        with self._lock:
+            if self._docs is None:
+                self._build()
+            term_scores = []
+            for term in terms:
+                scores = self._term_scores(term)
+                if not scores:
+                    return
+                term_scores.append(scores)
+            # Intersected from the rarest term, so each step walks the smallest set
+            term_scores.sort(key=len)
+            scores = term_scores[0]
+            for other in term_scores[1:]:
+                scores = {doc_id: score + other[doc_id]
+                          for doc_id, score in scores.items() if doc_id in other}
+                if not scores:
+                    return
+
+            # Scores take few distinct values: only documents scoring at least
+            # the limit-th best score are ordered, by score and then by id
+            ranked = list(scores)
+            if limit is not None and limit < len(ranked):
+                counts = sorted(Counter(scores.values()).items(), reverse=True)
+                total = 0
+                for cutoff, count in counts:
+                    total += count
+                    if total >= limit:
+                        break
+                ranked = [doc_id for doc_id, score in scores.items() if score >= cutoff]
+            ranked.sort()
+            ranked.sort(key=scores.__getitem__, reverse=True)
+            docs = self._docs
+            results = [docs[doc_id][1:] for doc_id in ranked[:limit]]
+        yield from results
+
+    def search_db(self, text, limit=None):
+        # Same ranking as search(), answered from the database with only the
+        # matching rows read, for one-off queries; typo matches take a pass over
+        # the stored tokens. Returns [(name, rel_path, score)].
+        terms = font_meta.tokenize(text)
+        if not terms or not os.path.exists(self.db_path):
+            return []
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error opening font index: {e}")
+            return []
+
+        scores = None
+        try:
+            for term in terms:
+                term_scores = {}
+                for token, rel_path, weight in conn.execute(
+                        "SELECT token, path, weight FROM tokens WHERE token >= ? AND token < ?",
+                        (term, term + "\U0010ffff")):
+                    score = weight if token == term else weight * PREFIX_FACTOR
+                    if term_scores.get(rel_path, 0) < score:
+                        term_scores[rel_path] = score
+                if not term_scores and len(term) >= FUZZY_MIN_LENGTH:
+                    self._fuzzy_scores_db(conn, term, term_scores)
+                for d, name in conn.execute("SELECT dir, name FROM files WHERE instr(lower(name), ?) > 0",
+                                            (term,)):
+                    rel_path = os.path.join(d, name) if d else name
+                    term_scores.setdefault(rel_path, SUBSTRING_SCORE)
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {p: scores[p] + score for p, score in term_scores.items() if p in scores}
+                if not scores:
+                    return []
+        except sqlite3.Error as e:
+            print(f"Error reading font index: {e}")
+            return []
+        finally:
+            conn.close()
+
+        ranked = sorted(scores, key=lambda p: (-scores[p], os.path.basename(p).lower()))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(os.path.basename(p), p, scores[p]) for p in ranked]
+
+    def _fuzzy_scores_db(self, conn, term, term_scores):
+        # Typo matches for search_db(), from a pass over the stored vocabulary
+        grams = _grams(term)
+        needed = max(1, len(grams) - GRAMS_PER_EDIT * _max_edits(term))
+        for (token,) in conn.execute("SELECT DISTINCT token FROM tokens"):
+            if len(grams & _grams(token)) < needed:
+                continue
+            match = _fuzzy_match(term, token)
+            if match is None:
+                continue
+            factor = _fuzzy_factor(term, *match)
+            for rel_path, weight in conn.execute("SELECT path, weight FROM tokens WHERE token = ?", (token,)):
+                if term_scores.get(rel_path, 0) < weight * factor:
+                    term_scores[rel_path] = weight * factor
+
+    def load_info(self, rel_paths):
+        # {rel path: info dict} for the given paths, read from the database
+        infos = {}
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error opening font index: {e}")
+            return infos
+        try:
+            for rel_path in rel_paths:
+                row = conn.execute("SELECT info FROM fontmeta WHERE path = ?", (rel_path,)).fetchone()
+                if row and row[0]:
+                    infos[rel_path] = json.loads(row[0])
+        except sqlite3.Error as e:
+            print(f"Error reading font index: {e}")
+        finally:
+            conn.close()
+        return infos
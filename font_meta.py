@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+import os
+import re
+import bisect
+import struct
+import zlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import archives
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Minimal sfnt reader for the tables the index cares about (name, OS/2, fvar,
+# cmap, post). Nothing here touches Qt, so it is safe to run in worker processes.
+
+WEIGHT_NAMES = {
+    100: "thin", 200: "extralight", 300: "light", 400: "regular", 500: "medium",
+    600: "semibold", 700: "bold", 800: "extrabold", 900: "black",
+}
+
+WIDTH_NAMES = {
+    1: "ultracondensed", 2: "extracondensed", 3: "condensed", 4: "semicondensed",
+    5: "normal", 6: "semiexpanded", 7: "expanded", 8: "extraexpanded", 9: "ultraexpanded",
+}
+
+# (first, last, block name, script)
+UNICODE_BLOCKS = (
+    (0x0000, 0x007F, "Basic Latin", "Latin"),
+    (0x0080, 0x00FF, "Latin-1 Supplement", "Latin"),
+    (0x0100, 0x017F, "Latin Extended-A", "Latin"),
+    (0x0180, 0x024F, "Latin Extended-B", "Latin"),
+    (0x0250, 0x02AF, "IPA Extensions", "Latin"),
+    (0x02B0, 0x02FF, "Spacing Modifier Letters", "Common"),
+    (0x0300, 0x036F, "Combining Diacritical Marks", "Common"),
+    (0x0370, 0x03FF, "Greek and Coptic", "Greek"),
+    (0x0400, 0x04FF, "Cyrillic", "Cyrillic"),
+    (0x0500, 0x052F, "Cyrillic Supplement", "Cyrillic"),
+    (0x0530, 0x058F, "Armenian", "Armenian"),
+    (0x0590, 0x05FF, "Hebrew", "Hebrew"),
+    (0x0600, 0x06FF, "Arabic", "Arabic"),
+    (0x0700, 0x074F, "Syriac", "Syriac"),
+    (0x0750, 0x077F, "Arabic Supplement", "Arabic"),
+    (0x0780, 0x07BF, "Thaana", "Thaana"),
+    (0x0900, 0x097F, "Devanagari", "Devanagari"),
+    (0x0980, 0x09FF, "Bengali", "Bengali"),
+    (0x0A00, 0x0A7F, "Gurmukhi", "Gurmukhi"),
+    (0x0A80, 0x0AFF, "Gujarati", "Gujarati"),
+    (0x0B00, 0x0B7F, "Oriya", "Oriya"),
+    (0x0B80, 0x0BFF, "Tamil", "Tamil"),
+    (0x0C00, 0x0C7F, "Telugu", "Telugu"),
+    (0x0C80, 0x0CFF, "Kannada", "Kannada"),
+    (0x0D00, 0x0D7F, "Malayalam", "Malayalam"),
+    (0x0D80, 0x0DFF, "Sinhala", "Sinhala"),
+    (0x0E00, 0x0E7F, "Thai", "Thai"),
+    (0x0E80, 0x0EFF, "Lao", "Lao"),
+    (0x0F00, 0x0FFF, "Tibetan", "Tibetan"),
+    (0x1000, 0x109F, "Myanmar", "Myanmar"),
+    (0x10A0, 0x10FF, "Georgian", "Georgian"),
+    (0x1100, 0x11FF, "Hangul Jamo", "Hangul"),
+    (0x1200, 0x137F, "Ethiopic", "Ethiopic"),
+    (0x13A0, 0x13FF, "Cherokee", "Cherokee"),
+    (0x1400, 0x167F, "Unified Canadian Aboriginal Syllabics", "Canadian Aboriginal"),
+    (0x1680, 0x169F, "Ogham", "Ogham"),
+    (0x16A0, 0x16FF, "Runic", "Runic"),
+    (0x1780, 0x17FF, "Khmer", "Khmer"),
+    (0x1800, 0x18AF, "Mongolian", "Mongolian"),
+    (0x1E00, 0x1EFF, "Latin Extended Additional", "Latin"),
+    (0x1F00, 0x1FFF, "Greek Extended", "Greek"),
+    (0x2000, 0x206F, "General Punctuation", "Common"),
+    (0x2070, 0x209F, "Superscripts and Subscripts", "Common"),
+    (0x20A0, 0x20CF, "Currency Symbols", "Common"),
+    (0x2100, 0x214F, "Letterlike Symbols", "Common"),
+    (0x2150, 0x218F, "Number Forms", "Common"),
+    (0x2190, 0x21FF, "Arrows", "Symbols"),
+    (0x2200, 0x22FF, "Mathematical Operators", "Math"),
+    (0x2300, 0x23FF, "Miscellaneous Technical", "Symbols"),
+    (0x2460, 0x24FF, "Enclosed Alphanumerics", "Symbols"),
+    (0x2500, 0x257F, "Box Drawing", "Symbols"),
+    (0x2580, 0x259F, "Block Elements", "Symbols"),
+    (0x25A0, 0x25FF, "Geometric Shapes", "Symbols"),
+    (0x2600, 0x26FF, "Miscellaneous Symbols", "Symbols"),
+    (0x2700, 0x27BF, "Dingbats", "Symbols"),
+    (0x2800, 0x28FF, "Braille Patterns", "Braille"),
+    (0x2C00, 0x2C5F, "Glagolitic", "Glagolitic"),
+    (0x2C60, 0x2C7F, "Latin Extended-C", "Latin"),
+    (0x2D00, 0x2D2F, "Georgian Supplement", "Georgian"),
+    (0x2D30, 0x2D7F, "Tifinagh", "Tifinagh"),
+    (0x2DE0, 0x2DFF, "Cyrillic Extended-A", "Cyrillic"),
+    (0x2E80, 0x2EFF, "CJK Radicals Supplement", "Han"),
+    (0x3000, 0x303F, "CJK Symbols and Punctuation", "Han"),
+    (0x3040, 0x309F, "Hiragana", "Hiragana"),
+    (0x30A0, 0x30FF, "Katakana", "Katakana"),
+    (0x3100, 0x312F, "Bopomofo", "Bopomofo"),
+    (0x3130, 0x318F, "Hangul Compatibility Jamo", "Hangul"),
+    (0x3400, 0x4DBF, "CJK Unified Ideographs Extension A", "Han"),
+    (0x4E00, 0x9FFF, "CJK Unified Ideographs", "Han"),
+    (0xA000, 0xA48F, "Yi Syllables", "Yi"),
+    (0xA640, 0xA69F, "Cyrillic Extended-B", "Cyrillic"),
+    (0xA720, 0xA7FF, "Latin Extended-D", "Latin"),
+    (0xA8E0, 0xA8FF, "Devanagari Extended", "Devanagari"),
+    (0xAB30, 0xAB6F, "Latin Extended-E", "Latin"),
+    (0xAC00, 0xD7AF, "Hangul Syllables", "Hangul"),
+    (0xE000, 0xF8FF, "Private Use Area", "Private Use"),
+    (0xF900, 0xFAFF, "CJK Compatibility Ideographs", "Han"),
+    (0xFB00, 0xFB4F, "Alphabetic Presentation Forms", "Latin"),
+    (0xFB50, 0xFDFF, "Arabic Presentation Forms-A", "Arabic"),
+    (0xFE00, 0xFE0F, "Variation Selectors", "Common"),
+    (0xFE70, 0xFEFF, "Arabic Presentation Forms-B", "Arabic"),
+    (0xFF00, 0xFFEF, "Halfwidth and Fullwidth Forms", "Han"),
+    (0x1D400, 0x1D7FF, "Mathematical Alphanumeric Symbols", "Math"),
+    (0x1F300, 0x1F5FF, "Miscellaneous Symbols and Pictographs", "Emoji"),
+    (0x1F600, 0x1F64F, "Emoticons", "Emoji"),
+    (0x1F680, 0x1F6FF, "Transport and Map Symbols", "Emoji"),
+    (0x1F900, 0x1F9FF, "Supplemental Symbols and Pictographs", "Emoji"),
+    (0x20000, 0x2A6DF, "CJK Unified Ideographs Extension B", "Han"),
+)
+
+# Scripts that do not say much on their own and are left out of search tokens
+NEUTRAL_SCRIPTS = ("Common", "Private Use")
+
+# A script counts as supported once the font covers this share of its blocks,
+# capped so big scripts such as Han do not need every ideograph
+SCRIPT_MIN_SHARE = 0.5
+SCRIPT_MIN_COUNT = 200
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+class FontFormatError(Exception):
+    pass
+
+
+# --- Container parsing ---
+def _read_at(f, offset, length):
+    f.seek(offset)
+    data = f.read(length)
+    if len(data) != length:
+        raise FontFormatError("Truncated font file")
+    return data
+
+
+def _read_base128(data, pos):
+    value = 0
+    for i in range(5):
+        byte = data[pos + i]
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos + i + 1
+    raise FontFormatError("Bad UIntBase128 value")
+
+
+WOFF2_KNOWN_TAGS = (
+    b"cmap", b"head", b"hhea", b"hmtx", b"maxp", b"name", b"OS/2", b"post", b"cvt ",
+    b"fpgm", b"glyf", b"loca", b"prep", b"CFF ", b"VORG", b"EBDT", b"EBLC", b"gasp",
+    b"hdmx", b"kern", b"LTSH", b"PCLT", b"VDMX", b"vhea", b"vmtx", b"BASE", b"GDEF",
+    b"GPOS", b"GSUB", b"EBSC", b"JSTF", b"MATH", b"CBDT", b"CBLC", b"COLR", b"CPAL",
+    b"SVG ", b"sbix", b"acnt", b"avar", b"bdat", b"bloc", b"bsln", b"cvar", b"fdsc",
+    b"feat", b"fmtx", b"fvar", b"gvar", b"hsty", b"just", b"lcar", b"mort", b"morx",
+    b"opbd", b"prop", b"trak", b"Zapf", b"Silf", b"Glat", b"Gloc", b"Feat", b"Sill",
+)
+
+
+class SfntReader:
+    # Random access to the tables of one face in a .ttf/.otf/.ttc/.woff/.woff2
+    # file. Plain sfnt and collection tables are read lazily with seeks, so a
+    # big collection never has to be held in memory. A font inside a zip archive
+    # is read into memory first.
+
+    def __init__(self, path, face_index=0):
+        self.path = path
+        self.face_index = face_index
+        self.num_faces = 1
+        self.is_collection = False
+        self.sfnt_version = None
+        self._tables = {}    # tag -> (offset, length, compressed length)
+        self._checksums = {}
+        self._woff = False
+        self._data = None    # decompressed WOFF2 table data
+        self._f = archives.open_file(path)
+        try:
+            self._parse_header()
+        except (struct.error, IndexError) as e:
+            self.close()
+            raise FontFormatError(str(e))
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _parse_header(self):
+        f = self._f
+        tag = _read_at(f, 0, 4)
+        if tag == b"ttcf":
+            _, num_fonts = struct.unpack(">II", _read_at(f, 4, 8))
+            self.num_faces = num_fonts
+            self.is_collection = True
+            if not 0 <= self.face_index < num_fonts:
+                raise FontFormatError("Face index out of range")
+            offset = struct.unpack(">I", _read_at(f, 12 + 4 * self.face_index, 4))[0]
+            self._parse_sfnt_directory(offset)
+        elif tag == b"wOFF":
+            self._woff = True
+            num_tables = struct.unpack(">H", _read_at(f, 12, 2))[0]
+            entries = _read_at(f, 44, 20 * num_tables)
+            for i in range(num_tables):
+                t, offset, comp_len, orig_len, _ = struct.unpack_from(">4sIIII", entries, 20 * i)
+                self._tables[t] = (offset, orig_len, comp_len)
+        elif tag == b"wOF2":
+            self._parse_woff2()
+        elif tag in (b"\x00\x01\x00\x00", b"OTTO", b"true"):
+            self._parse_sfnt_directory(0)
+        else:
+            raise FontFormatError("Not an sfnt font")
+
+    def _parse_sfnt_directory(self, offset):
+        self.sfnt_version, num_tables = struct.unpack(">4sH", _read_at(self._f, offset, 6))
+        entries = _read_at(self._f, offset + 12, 16 * num_tables)
+        for i in range(num_tables):
+            t, checksum, t_offset, length = struct.unpack_from(">4sIII", entries, 16 * i)
+            self._tables[t] = (t_offset, length, length)
+            self._checksums[t] = checksum
+
+    def _parse_woff2(self):
+        if brotli is None:
+            raise FontFormatError("WOFF2 support needs the brotli module")
+        f = self._f
+        header = _read_at(f, 0, 48)
+        flavor, length, num_tables = struct.unpack_from(">4sIH", header, 4)
+        total_compressed = struct.unpack_from(">I", header, 20)[0]
+        f.seek(48)
+        rest = f.read()
+
+        pos = 0
+        entries = []
+        for _ in range(num_tables):
+            flags = rest[pos]
+            pos += 1
+            if flags & 0x3F == 0x3F:
+                t = rest[pos:pos + 4]
+                pos += 4
+            else:
+                t = WOFF2_KNOWN_TAGS[flags & 0x3F]
+            orig_len, pos = _read_base128(rest, pos)
+            transform = (flags >> 6) & 0x03
+            transformed = transform != 3 if t in (b"glyf", b"loca") else transform != 0
+            if transformed:
+                t_len, pos = _read_base128(rest, pos)
+            else:
+                t_len = orig_len
+            entries.append((t, t_len))
+
+        if flavor == b"ttcf":
+            raise FontFormatError("WOFF2 collections are not supported")
+
+        try:
+            self._data = brotli.decompress(rest[pos:pos + total_compressed])
+        except brotli.error as e:
+            raise FontFormatError(f"Bad WOFF2 data: {e}")
+        offset = 0
+        for t, t_len in entries:
+            self._tables[t] = (offset, t_len, t_len)
+            offset += t_len
+
+    def has_table(self, tag):
+        return tag in self._tables
+
+    def table(self, tag):
+        entry = self._tables.get(tag)
+        if entry is None:
+            return None
+        offset, length, comp_len = entry
+        if self._data is not None:
+            return self._data[offset:offset + length]
+        data = _read_at(self._f, offset, comp_len)
+        if self._woff and comp_len < length:
+            data = zlib.decompress(data)
+        return data
+
+
+# --- Table parsing ---
+def _decode_name(platform_id, encoding_id, raw):
+    if platform_id in (0, 3):
+        return raw.decode("utf-16-be", "replace")
+    if platform_id == 1 and encoding_id == 0:
+        return raw.decode("mac_roman", "replace")
+    return None
+
+
+def parse_names(data):
+    # nameID -> string, preferring Windows English, then any Unicode, then Mac Roman
+    names = {}
+    ranks = {}
+    if not data or len(data) < 6:
+        return names
+    _, count, string_offset = struct.unpack_from(">HHH", data, 0)
+    for i in range(count):
+        rec = 6 + 12 * i
+        if rec + 12 > len(data):
+            break
+        platform_id, encoding_id, lang_id, name_id, length, offset = struct.unpack_from(">HHHHHH", data, rec)
+        if platform_id == 3 and lang_id == 0x409:
+            rank = 0
+        elif platform_id == 3:
+            rank = 1
+        elif platform_id == 0:
+            rank = 2
+        elif platform_id == 1 and lang_id == 0:
+            rank = 3
+        else:
+            continue
+        if name_id in ranks and ranks[name_id] <= rank:
+            continue
+        start = string_offset + offset
+        text = _decode_name(platform_id, encoding_id, data[start:start + length])
+        if text:
+            names[name_id] = text.strip("\0 ")
+            ranks[name_id] = rank
+    return names
+
+
+def parse_cmap(data):
+    # Returns the set of codepoints that map to a real glyph
+    codepoints = set()
+    if not data or len(data) < 4:
+        return codepoints
+    num_tables = struct.unpack_from(">H", data, 2)[0]
+    subtables = {}
+    for i in range(num_tables):
+        platform_id, encoding_id, offset = struct.unpack_from(">HHI", data, 4 + 8 * i)
+        if offset + 2 > len(data):
+            continue
+        fmt = struct.unpack_from(">H", data, offset)[0]
+        subtables[(platform_id, encoding_id, fmt)] = offset
+
+    for key in ((3, 10, 12), (0, 6, 13), (0, 4, 12), (0, 3, 12), (3, 1, 4), (0, 3, 4),
+                (0, 1, 4), (0, 0, 4), (3, 0, 4)):
+        offset = subtables.get(key)
+        if offset is None:
+            continue
+        if key[2] == 4:
+            _parse_cmap_format4(data, offset, codepoints)
+        else:
+            _parse_cmap_format12(data, offset, codepoints)
+        if codepoints:
+            break
+    return codepoints
+
+
+def _parse_cmap_format4(data, offset, codepoints):
+    seg_count = struct.unpack_from(">H", data, offset + 6)[0] // 2
+    end_pos = offset + 14
+    start_pos = end_pos + 2 * seg_count + 2
+    delta_pos = start_pos + 2 * seg_count
+    range_pos = delta_pos + 2 * seg_count
+    ends = struct.unpack_from(f">{seg_count}H", data, end_pos)
+    starts = struct.unpack_from(f">{seg_count}H", data, start_pos)
+    deltas = struct.unpack_from(f">{seg_count}h", data, delta_pos)
+    range_offsets = struct.unpack_from(f">{seg_count}H", data, range_pos)
+
+    for i in range(seg_count):
+        start, end, delta, range_offset = starts[i], ends[i], deltas[i], range_offsets[i]
+        if start == 0xFFFF:
+            continue
+        if range_offset == 0:
+            for c in range(start, end + 1):
+                if (c + delta) & 0xFFFF:
+                    codepoints.add(c)
+            continue
+        for c in range(start, end + 1):
+            pos = range_pos + 2 * i + range_offset + 2 * (c - start)
+            if pos + 2 > len(data):
+                break
+            glyph = struct.unpack_from(">H", data, pos)[0]
+            if glyph and (glyph + delta) & 0xFFFF:
+                codepoints.add(c)
+
+
+def _parse_cmap_format12(data, offset, codepoints):
+    num_groups = struct.unpack_from(">I", data, offset + 12)[0]
+    pos = offset + 16
+    for _ in range(num_groups):
+        if pos + 12 > len(data):
+            break
+        start, end, start_glyph = struct.unpack_from(">III", data, pos)
+        pos += 12
+        end = min(end, 0x10FFFF)
+        if start_glyph == 0:
+            start += 1
+        codepoints.update(range(start, end + 1))
+
+
+def parse_fvar(data, names):
+    axes = []
+    instances = []
+    if not data or len(data) < 16:
+        return axes, instances
+    (_, _, axes_offset, _, axis_count, axis_size,
+     instance_count, instance_size) = struct.unpack_from(">HHHHHHHH", data, 0)
+    for i in range(axis_count):
+        pos = axes_offset + i * axis_size
+        tag, min_v, default_v, max_v, flags, name_id = struct.unpack_from(">4siiiHH", data, pos)
+        axes.append({
+            "tag": tag.decode("latin-1"),
+            "min": min_v / 65536.0,
+            "default": default_v / 65536.0,
+            "max": max_v / 65536.0,
+            "hidden": bool(flags & 0x0001),
+            "name": names.get(name_id) or tag.decode("latin-1"),
+        })
+    pos = axes_offset + axis_count * axis_size
+    for i in range(instance_count):
+        inst = pos + i * instance_size
+        name_id = struct.unpack_from(">H", data, inst)[0]
+        coords = struct.unpack_from(f">{axis_count}i", data, inst + 4)
+        instances.append({
+            "name": names.get(name_id, ""),
+            "coords": {axis["tag"]: c / 65536.0 for axis, c in zip(axes, coords)},
+        })
+    return axes, instances
+
+
+def scripts_for(codepoints):
+    ordered = sorted(codepoints)
+    totals = {}
+    covered = {}
+    for first, last, _, script in UNICODE_BLOCKS:
+        if script in NEUTRAL_SCRIPTS:
+            continue
+        totals[script] = totals.get(script, 0) + (last - first + 1)
+        count = bisect.bisect_right(ordered, last) - bisect.bisect_left(ordered, first)
+        covered[script] = covered.get(script, 0) + count
+
+    scripts = []
+    for script, total in totals.items():
+        needed = min(total * SCRIPT_MIN_SHARE, SCRIPT_MIN_COUNT)
+        if covered[script] >= max(needed, 1):
+            scripts.append(script)
+    return scripts
+
+
+def block_ranges(ordered):
+    # (block, script, start, end) for every Unicode block with codepoints in the
+    # sorted sequence ordered; ordered[start:end] are the block's codepoints
+    ranges = []
+    for first, last, block, script in UNICODE_BLOCKS:
+        start = bisect.bisect_left(ordered, first)
+        end = bisect.bisect_right(ordered, last, start)
+        if end > start:
+            ranges.append((block, script, start, end))
+    return ranges
+
+
+def read_codepoints(path, face_index=0):
+    # Sorted codepoints of one face, without parsing anything but the cmap.
+    # Raises OSError or FontFormatError.
+    try:
+        with SfntReader(path, face_index) as reader:
+            return sorted(parse_cmap(reader.table(b"cmap")))
+    except (struct.error, zlib.error, ValueError) as e:
+        raise FontFormatError(f"Bad cmap table in {path}: {e}")
+
+
+def read_faces(path):
+    # (family, subfamily) of every face of a .ttc/.otc, [] for a single font.
+    # Only the collection header and the name tables are read.
+    faces = []
+    try:
+        with SfntReader(path) as reader:
+            if not reader.is_collection:
+                return faces
+            num_faces = reader.num_faces
+        for i in range(num_faces):
+            with SfntReader(path, i) as reader:
+                names = parse_names(reader.table(b"name"))
+            faces.append((names.get(16) or names.get(1, ""), names.get(17) or names.get(2, "")))
+    except (struct.error, ValueError) as e:
+        raise FontFormatError(f"Bad font collection {path}: {e}")
+    return faces
+
+
+def extract_face(path, face_index):
+    # One face of a collection as a standalone sfnt file, so it can be loaded
+    # without the rest of the collection. Tables are copied as they are.
+    # Raises OSError or FontFormatError.
+    with SfntReader(path, face_index) as reader:
+        if reader.sfnt_version is None:
+            raise FontFormatError(f"{path} is not an sfnt font")
+        tags = sorted(reader._tables)
+        num_tables = len(tags)
+        entry_selector = max(num_tables.bit_length() - 1, 0)
+        search_range = 16 << entry_selector
+        header = bytearray(struct.pack(">4sHHHH", reader.sfnt_version, num_tables, search_range,
+                                       entry_selector, num_tables * 16 - search_range))
+        body = bytearray()
+        offset = 12 + 16 * num_tables
+        for tag in tags:
+            data = reader.table(tag)
+            header += struct.pack(">4sIII", tag, reader._checksums.get(tag, 0),
+                                  offset + len(body), len(data))
+            body += data
+            body += b"\0" * (-len(data) % 4)
+    return bytes(header + body)
+
+
+def read_axes(path, face_index=0):
+    # (axes, named instances) of a variable face, both empty for a static one.
+    # Only the name and fvar tables are read. Raises OSError or FontFormatError.
+    try:
+        with SfntReader(path, face_index) as reader:
+            if not reader.has_table(b"fvar"):
+                return [], []
+            return parse_fvar(reader.table(b"fvar"), parse_names(reader.table(b"name")))
+    except (struct.error, zlib.error, ValueError) as e:
+        raise FontFormatError(f"Bad fvar table in {path}: {e}")
+
+
+def _classes_for(os2, post, names):
+    classes = set()
+    family = " ".join(filter(None, (names.get(1), names.get(16)))).lower()
+    if os2 and len(os2) >= 42:
+        family_class = struct.unpack_from(">h", os2, 30)[0] >> 8
+        panose = os2[32:42]
+        if family_class in (1, 2, 3, 4, 5, 7):
+            classes.add("serif")
+        elif family_class == 8:
+            classes.add("sans")
+        elif family_class == 10:
+            classes.add("script")
+        elif family_class == 12:
+            classes.add("symbol")
+        if panose[0] == 2:
+            if 2 <= panose[1] <= 10:
+                classes.add("serif")
+            elif 11 <= panose[1] <= 13:
+                classes.add("sans")
+            if panose[3] == 9:
+                classes.add("mono")
+        elif panose[0] == 3:
+            classes.add("script")
+        elif panose[0] == 5:
+            classes.add("symbol")
+    if post and len(post) >= 16 and struct.unpack_from(">I", post, 12)[0]:
+        classes.add("mono")
+    if "mono" in family:
+        classes.add("mono")
+    if "sans" in family:
+        classes.discard("serif")
+        classes.add("sans")
+    elif "serif" in family:
+        classes.add("serif")
+    return sorted(classes)
+
+
+def read_font_info(path, face_index=0, with_codepoints=False):
+    # Returns a dict describing one face, or None if the file cannot be parsed
+    try:
+        with SfntReader(path, face_index) as reader:
+            names = parse_names(reader.table(b"name"))
+            os2 = reader.table(b"OS/2")
+            post = reader.table(b"post")
+            codepoints = parse_cmap(reader.table(b"cmap"))
+            axes, instances = parse_fvar(reader.table(b"fvar"), names)
+            num_faces = reader.num_faces
+    except (OSError, FontFormatError, struct.error, zlib.error, ValueError) as e:
+        print(f"Error reading font metadata from {path}: {e}")
+        return None
+
+    info = {
+        "family": names.get(16) or names.get(1, ""),
+        "subfamily": names.get(17) or names.get(2, ""),
+        "full_name": names.get(4, ""),
+        "designer": names.get(9, ""),
+        "manufacturer": names.get(8, ""),
+        "vendor": "",
+        "weight": 400,
+        "width": 5,
+        "italic": False,
+        "classes": _classes_for(os2, post, names),
+        "scripts": scripts_for(codepoints),
+        "axes": axes,
+        "instances": instances,
+        "faces": num_faces,
+        "glyphs": len(codepoints),
+    }
+    if os2 and len(os2) >= 64:
+        info["weight"] = struct.unpack_from(">H", os2, 4)[0]
+        info["width"] = struct.unpack_from(">H", os2, 6)[0]
+        info["vendor"] = os2[58:62].decode("latin-1").strip("\0 ")
+        info["italic"] = bool(struct.unpack_from(">H", os2, 62)[0] & 0x0001)
+    if "italic" in info["subfamily"].lower() or "oblique" in info["subfamily"].lower():
+        info["italic"] = True
+    if with_codepoints:
+        info["codepoints"] = codepoints
+    return info
+
+
+def _nearest(table, value):
+    return table[min(table, key=lambda k: abs(k - value))]
+
+
+def search_fields(info):
+    # Field name -> text that the inverted index should tokenise
+    fields = {
+        "family": info.get("family", ""),
+        "subfamily": info.get("subfamily", ""),
+        "full_name": info.get("full_name", ""),
+        "designer": " ".join(filter(None, (info.get("designer"), info.get("manufacturer")))),
+        "vendor": info.get("vendor", ""),
+        "classes": " ".join(info.get("classes", ())),
+        "scripts": " ".join(info.get("scripts", ())),
+        "weight": _nearest(WEIGHT_NAMES, info.get("weight") or 400),
+        "width": _nearest(WIDTH_NAMES, info.get("width") or 5),
+    }
+    if info.get("italic"):
+        fields["subfamily"] += " italic"
+    if info.get("axes"):
+        fields["classes"] += " variable " + " ".join(a["tag"] for a in info["axes"])
+    return fields
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+# --- Parallel extraction ---
+def _extract_one(path):
+    return path, read_font_info(path)
+
+
+class MetadataExtractor:
+    # Process pool for read_font_info. Workers are spawned rather than forked, as
+    # the GUI process has Qt threads running.
+
+    CHUNK_SIZE = 16
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+
+    def extract(self, paths):
+        if len(paths) < self.CHUNK_SIZE:
+            return [_extract_one(p) for p in paths]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return list(self._pool.map(_extract_one, paths, chunksize=self.CHUNK_SIZE))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import os
+import json
+import socket
+
+# Session state and the single-instance socket. Qt-free, so main.py can hand the
+# fonts to a running viewer before paying for the PyQt5 import.
+
+CONFIG_DIR = os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"),
+                          "font-fragrance")
+STATE_PATH = os.path.join(CONFIG_DIR, "state.json")
+SOCKET_PATH = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp",
+                           f"font-fragrance-{os.getuid()}.sock")
+SOCKET_TIMEOUT_S = 2
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error reading session state: {e}")
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save_state(state, path=STATE_PATH):
+    # Written to a temporary file first, so a crash never leaves half a file
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing session state: {e}")
+
+
+def encode_request(paths):
+    # One absolute path per line and an empty line at the end; a request
+    # without paths just raises the window
+    lines = "".join(f"{os.path.abspath(p)}\n" for p in paths)
+    return f"{lines}\n".encode("utf-8", "surrogateescape")
+
+
+def request_complete(data):
+    return data == b"\n" or data.endswith(b"\n\n")
+
+
+def decode_request(data):
+    return [p for p in data.decode("utf-8", "surrogateescape").split("\n") if p]
+
+
+def forward_to_running(paths, socket_path=SOCKET_PATH):
+    # Hands the paths to a viewer that is already running. Returns False when
+    # there is none (no socket, or a stale one left by a crash).
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(SOCKET_TIMEOUT_S)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(encode_request(paths))
+        return sock.recv(16).startswith(b"ok")
+    except OSError:
+        return False
+    finally:
+        sock.close()
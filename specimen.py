@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+import os
+from PyQt5.QtCore import Qt, QSizeF, QMarginsF, QByteArray
+from PyQt5.QtGui import (QFontDatabase, QFont, QColor, QTextDocument, QTextCursor,
+                         QTextCharFormat, QTextBlockFormat, QBrush, QImage, QPainter,
+                         QPdfWriter, QPageSize, QPageLayout, QGuiApplication)
+
+import archives
+
+# The specimen shown on the canvas. Only QtGui is needed, so it can also be
+# built in offscreen worker processes for export.
+
+HEADING_BASE_SIZE = 48
+DEFAULT_HEADING = "The quick brown fox jumps over the lazy dog."
+EXPORT_BACKGROUND = "#2d2d2d"
+EXPORT_PADDING = 50
+
+SPECIMEN_BODY = (
+    "The quick brown fox jumps over the lazy dog, not because he is in a hurry, but because the quiet afternoon makes him restless. The sun hangs low in the sky, warming the grass, and the fox feels a sudden urge to prove that his legs are still strong and swift. The dog barely opens one eye, letting out a slow yawn, unimpressed by the fox’s display."
+    "After landing softly on the other side, the fox pauses and looks back. He notices that the dog is old, tired, and comfortable in his laziness. For a moment, the fox feels a strange mix of pride and sympathy. Speed and cleverness have always been his strengths, but watching the dog rest so peacefully makes him wonder if constant movement is truly necessary."
+    "The dog finally lifts his head and speaks in a calm voice, telling the fox that there is wisdom in resting and joy in being content. The fox listens carefully, realizing that life is not only about jumping higher or running faster. Sometimes, it is also about knowing when to slow down."
+    "As evening approaches, the fox walks away more thoughtfully than before. The dog closes his eyes again, smiling slightly. In that quiet field, both animals learn something important balance between action and rest is what makes life complete."
+)
+SPECIMEN_ENDING = "--------------~12345!@#$)000(%^&*67890~--------------"
+
+def heading_size(zoom):
+    return int(HEADING_BASE_SIZE * (zoom / 100.0))
+
+class SpecimenDocument:
+    # The preview document for one (family, style, heading text, caps). The heading
+    # block range is remembered so a zoom change only updates its char format in
+    # place instead of rebuilding and relaying out the whole document.
+
+    def __init__(self, family, style, heading, zoom, parent=None):
+        self.family = family
+        self.style = style
+        self.zoom = zoom
+
+        font_db = QFontDatabase()
+        self.doc = QTextDocument(parent)
+        cursor = QTextCursor(self.doc)
+
+        block_fmt_normal = QTextBlockFormat()
+        block_fmt_normal.setBottomMargin(5)
+        block_fmt_normal.setTopMargin(0)
+
+        block_fmt_large_gap = QTextBlockFormat()
+        block_fmt_large_gap.setBottomMargin(15)
+        block_fmt_large_gap.setTopMargin(10)
+
+        # 1. Style Label
+        cursor.insertBlock(block_fmt_normal)
+        style_lbl_fmt = QTextCharFormat()
+        style_lbl_fmt.setForeground(QBrush(QColor("gray")))
+        style_lbl_fmt.setFont(QFont("sans-serif", 10))
+        cursor.insertText(f"STYLE: {style.upper()}\n", style_lbl_fmt)
+
+        # 2. Heading
+        head_font = font_db.font(family, style, heading_size(zoom))
+        head_fmt = QTextCharFormat()
+        head_fmt.setFont(head_font)
+        head_fmt.setForeground(QBrush(QColor("white")))
+
+        cursor.insertBlock(block_fmt_large_gap)
+        self.heading_start = cursor.position()
+        cursor.insertText(heading + "\n", head_fmt)
+        self.heading_end = cursor.position()
+
+        # 3. Body (Fixed 13px)
+        body_font = font_db.font(family, style, 13)
+        body_fmt = QTextCharFormat()
+        body_fmt.setFont(body_font)
+        body_fmt.setForeground(QBrush(QColor("white")))
+
+        cursor.insertBlock(block_fmt_large_gap)
+        cursor.insertText(SPECIMEN_BODY + "\n\n", body_fmt)
+
+        # 4. Ending (Fixed 13px)
+        end_font = font_db.font(family, style, 13)
+        end_fmt = QTextCharFormat()
+        end_fmt.setFont(end_font)
+        end_fmt.setForeground(QBrush(QColor("#aaaaaa")))
+
+        end_block_fmt = QTextBlockFormat()
+        end_block_fmt.setAlignment(Qt.AlignHCenter)
+        end_block_fmt.setTopMargin(10)
+        end_block_fmt.setBottomMargin(20)
+
+        cursor.insertBlock(end_block_fmt)
+        cursor.insertText(SPECIMEN_ENDING, end_fmt)
+
+    def set_zoom(self, zoom):
+        if zoom == self.zoom:
+            return
+        self.zoom = zoom
+        cursor = QTextCursor(self.doc)
+        cursor.setPosition(self.heading_start)
+        cursor.setPosition(self.heading_end, QTextCursor.KeepAnchor)
+        size_fmt = QTextCharFormat()
+        size_fmt.setFontPointSize(heading_size(zoom))
+        cursor.mergeCharFormat(size_fmt)
+
+# --- Export ---
+_worker_app = None
+
+def init_export_worker():
+    global _worker_app
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    _worker_app = QGuiApplication(["font-fragrance-export"])
+
+def export_specimen(path, out_path, style=None, heading=DEFAULT_HEADING, caps=False, zoom=100, width=1200):
+    # Runs in an export worker. Renders the specimen of the font at path to a
+    # PNG image or, when out_path ends in .pdf, a one-page PDF of the same size.
+    # Returns out_path, or raises ValueError if Qt can't load the font.
+    if archives.split(path):
+        font_id = QFontDatabase.addApplicationFontFromData(QByteArray(archives.read_member(path, cache=False)))
+    else:
+        font_id = QFontDatabase.addApplicationFont(path)
+    if font_id == -1:
+        raise ValueError(f"Cannot load font {path}")
+    try:
+        families = QFontDatabase.applicationFontFamilies(font_id)
+        if not families:
+            raise ValueError(f"No font families in {path}")
+        family = families[0]
+        styles = QFontDatabase().styles(family) or ["Regular"]
+        if style not in styles:
+            style = styles[0]
+
+        specimen = SpecimenDocument(family, style, heading.upper() if caps else heading, zoom)
+        doc = specimen.doc
+        doc.setDocumentMargin(EXPORT_PADDING)
+        doc.setTextWidth(width)
+        height = int(doc.size().height()) + 1
+
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        if out_path.lower().endswith(".pdf"):
+            # 72 dpi, so one point on the page is one pixel of the image
+            writer = QPdfWriter(out_path)
+            writer.setResolution(72)
+            writer.setPageSize(QPageSize(QSizeF(width, height), QPageSize.Point))
+            writer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Point)
+            painter = QPainter(writer)
+        else:
+            image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+            painter = QPainter(image)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        painter.fillRect(0, 0, width, height, QColor(EXPORT_BACKGROUND))
+        doc.drawContents(painter)
+        painter.end()
+
+        if not out_path.lower().endswith(".pdf") and not image.save(out_path, "PNG"):
+            raise ValueError(f"Cannot write {out_path}")
+        return out_path
+    finally:
+        QFontDatabase.removeApplicationFont(font_id)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import struct
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archives
+from font_meta import SfntReader, read_axes
+
+
+def empty_sfnt():
+    # A TrueType header with no tables
+    return struct.pack(">IHHHH", 0x00010000, 0, 0, 0, 0)
+
+
+class MemberCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.archive = os.path.join(self.dir, "Vendor.zip")
+        with zipfile.ZipFile(self.archive, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("otf/Sans.ttf", empty_sfnt())
+        self.path = os.path.join(self.archive, "otf", "Sans.ttf")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_selecting_member_twice_inflates_once(self):
+        with mock.patch.object(archives._Listing, "read", autospec=True,
+                               side_effect=archives._Listing.read) as read:
+            for _ in range(2):
+                SfntReader(self.path).close()
+                read_axes(self.path)
+        self.assertEqual(read.call_count, 1)
+
+    def test_uncached_open_does_not_fill_cache(self):
+        before = archives.stats()["members"]
+        with archives.open_file(self.path, cache=False) as f:
+            self.assertEqual(f.read(), empty_sfnt())
+        self.assertEqual(archives.stats()["members"], before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import os
+import sys
+import struct
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import font_meta
+from font_meta import FontFormatError, SfntReader, read_font_info
+
+
+def corrupt_woff2():
+    # A WOFF2 file with one "name" table whose brotli stream is garbage
+    compressed = b"\xff" * 32
+    header = struct.pack(">4s4sIHHIIHHIIIII", b"wOF2", b"\x00\x01\x00\x00", 0, 1, 0,
+                         0, len(compressed), 1, 0, 0, 0, 0, 0, 0)
+    return header + bytes([5, 10]) + compressed
+
+
+@unittest.skipIf(font_meta.brotli is None, "needs the brotli module")
+class CorruptWoff2Test(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".woff2")
+        with os.fdopen(fd, "wb") as f:
+            f.write(corrupt_woff2())
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_reader_raises_format_error(self):
+        with self.assertRaises(FontFormatError):
+            SfntReader(self.path).close()
+
+    def test_read_font_info_returns_none(self):
+        self.assertIsNone(read_font_info(self.path))
+
+    def test_truncated_file_returns_none(self):
+        with open(self.path, "r+b") as f:
+            f.truncate(49)
+        self.assertIsNone(read_font_info(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import archives
+from font_index import CACHE_DIR
+
+# Specimen thumbnails are rendered in worker processes, each with its own
+# offscreen QGuiApplication, and stored as PNG files named after the font's
+# content hash, the sample text and the size. Qt is only imported inside the
+# workers, so this module is cheap to import.
+
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "thumbnails")
+THUMBNAIL_BACKGROUND = "#2d2d2d"
+THUMBNAIL_FOREGROUND = "#ffffff"
+
+_worker_app = None
+
+
+def thumbnail_name(digest, text, width, height):
+    key = hashlib.sha1(f"{digest}\0{text}\0{width}x{height}".encode("utf-8")).hexdigest()
+    return f"{key}.png"
+
+
+def init_worker():
+    global _worker_app
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PyQt5.QtGui import QGuiApplication
+    _worker_app = QGuiApplication(["font-fragrance-thumbnails"])
+
+
+def render_thumbnail(path, text, width, height, cache_dir=THUMBNAIL_DIR):
+    # Runs in a worker. Returns (content digest, png path or None). The file is
+    # read once: the same bytes are hashed and handed to Qt.
+    from PyQt5.QtCore import Qt, QByteArray, QRect
+    from PyQt5.QtGui import QFontDatabase, QImage, QPainter, QFont, QColor, QFontMetrics
+
+    data = archives.read_bytes(path, cache=False)
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    out_path = os.path.join(cache_dir, thumbnail_name(digest, text, width, height))
+    if os.path.exists(out_path):
+        return digest, out_path
+
+    font_id = QFontDatabase.addApplicationFontFromData(QByteArray(data))
+    if font_id == -1:
+        return digest, None
+    try:
+        families = QFontDatabase.applicationFontFamilies(font_id)
+        if not families:
+            return digest, None
+
+        font = QFont(families[0])
+        font.setPixelSize(max(8, int(height * 0.55)))
+
+        image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        image.fill(QColor(THUMBNAIL_BACKGROUND))
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        painter.setFont(font)
+        painter.setPen(QColor(THUMBNAIL_FOREGROUND))
+        rect = QRect(8, 0, width - 16, height)
+        elided = QFontMetrics(font).elidedText(text, Qt.ElideRight, rect.width())
+        painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter, elided)
+        painter.end()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        if not image.save(tmp_path, "PNG"):
+            return digest, None
+        os.replace(tmp_path, out_path)
+        return digest, out_path
+    finally:
+        QFontDatabase.removeApplicationFont(font_id)
+
+
+def create_pool(max_workers=None):
+    return ProcessPoolExecutor(max_workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context("spawn"),
+                               initializer=init_worker)
+
+
+class ThumbnailCache:
+    # Maps (path, size, mtime) to the content digest of the file, so a cached
+    # thumbnail can be found without reading the font again.
+
+    def __init__(self, cache_dir=THUMBNAIL_DIR):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, "digests.sqlite3")
+        self._digests = None
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS digests ("
+                               "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, "
+                               "digest TEXT NOT NULL)")
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _load(self):
+        self._digests = {}
+        try:
+            for path, size, mtime, digest in self._connect().execute(
+                    "SELECT path, size, mtime, digest FROM digests"):
+                self._digests[path] = (size, mtime, digest)
+        except sqlite3.Error as e:
+            print(f"Error reading thumbnail cache: {e}")
+
+    def lookup(self, path, size, mtime, text, width, height):
+        # Returns the cached png path, or None if it has to be rendered
+        if self._digests is None:
+            self._load()
+        entry = self._digests.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            return None
+        png_path = os.path.join(self.cache_dir, thumbnail_name(entry[2], text, width, height))
+        return png_path if os.path.exists(png_path) else None
+
+    def remember(self, path, size, mtime, digest):
+        if self._digests is None:
+            self._load()
+        self._digests[path] = (size, mtime, digest)
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO digests (path, size, mtime, digest) "
+                             "VALUES (?, ?, ?, ?)", (path, size, mtime, digest))
+        except sqlite3.Error as e:
+            print(f"Error writing thumbnail cache: {e}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import resource
+import threading
+from collections import deque
+
+# Lightweight tracing for the hot paths: directory scans, searches, font
+# registration, document layout and installs. Spans record their duration and
+# arguments (item counts, paths...), counters record sampled values such as RSS
+# and cache hit rates. Everything can be exported as Chrome trace-event JSON
+# (chrome://tracing, Perfetto).
+#
+# While tracing is off, span() returns a shared do-nothing object, so an
+# instrumented call costs one function call and one flag check.
+#
+# FONT_FRAGRANCE_TRACE=1 turns tracing on at startup; any other value is also
+# taken as the path the trace is written to on exit.
+
+TRACE_ENV = "FONT_FRAGRANCE_TRACE"
+MAX_EVENTS = 20000
+
+_env = os.environ.get(TRACE_ENV, "")
+enabled = bool(_env)
+export_path = _env if _env not in ("", "0", "1") else None
+
+_lock = threading.Lock()
+_epoch = time.perf_counter()
+_events = deque(maxlen=MAX_EVENTS)   # (phase, name, start s, duration s, thread id, args)
+_stats = {}                          # name -> [count, total s, max s, last s, items]
+_threads = {}                        # thread id -> name
+
+
+def set_enabled(on):
+    global enabled
+    enabled = bool(on)
+
+
+def rss_mb():
+    # Current resident set size; the peak where /proc isn't available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        _record("X", self.name, self.start, end - self.start, self.args)
+        return False
+
+    def set(self, **args):
+        # Results only known at the end, e.g. how many items were found
+        self.args.update(args)
+
+
+def span(name, **args):
+    if not enabled:
+        return _NULL_SPAN
+    return Span(name, args)
+
+
+def counter(name, **values):
+    if enabled:
+        _record("C", name, time.perf_counter(), 0.0, values)
+
+
+def _record(phase, name, start, duration, args):
+    thread = threading.current_thread()
+    with _lock:
+        _events.append((phase, name, start, duration, thread.ident, args))
+        _threads[thread.ident] = thread.name
+        if phase != "X":
+            return
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = [0, 0.0, 0.0, 0.0, 0]
+        stat[0] += 1
+        stat[1] += duration
+        stat[2] = max(stat[2], duration)
+        stat[3] = duration
+        count = args.get("count")
+        if isinstance(count, int):
+            stat[4] += count
+
+
+def summary():
+    # [(name, calls, total ms, mean ms, max ms, last ms, items)], slowest total first
+    with _lock:
+        rows = [(name, s[0], s[1] * 1000, s[1] * 1000 / s[0], s[2] * 1000, s[3] * 1000, s[4])
+                for name, s in _stats.items()]
+    rows.sort(key=lambda r: -r[2])
+    return rows
+
+
+def last_counters():
+    # name -> values of the most recent sample of each counter
+    with _lock:
+        events = list(_events)
+    latest = {}
+    for phase, name, _, _, _, args in events:
+        if phase == "C":
+            latest[name] = args
+    return latest
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _stats.clear()
+
+
+def export_chrome_trace(path):
+    with _lock:
+        events = list(_events)
+        threads = dict(_threads)
+    pid = os.getpid()
+    trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+             for tid, name in threads.items()]
+    for phase, name, start, duration, tid, args in events:
+        event = {"name": name, "ph": phase, "pid": pid, "tid": tid,
+                 "ts": round((start - _epoch) * 1e6, 1), "args": args}
+        if phase == "X":
+            event["dur"] = round(duration * 1e6, 1)
+        trace.append(event)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, default=str)
+
+
+def export_on_exit():
+    # Writes the trace to the path from FONT_FRAGRANCE_TRACE, if one was given
+    if export_path and enabled:
+        try:
+            export_chrome_trace(export_path)
+        except OSError as e:
+            print(f"Error writing trace: {e}")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import io
+import logging
+
+import archives
+
+try:
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+    from fontTools import subset
+except ImportError:
+    TTFont = None
+    instancer = None
+    subset = None
+
+# Static instances of variable fonts at arbitrary axis positions, for the axis
+# sliders. Qt 5 cannot set font variations itself, so every position is cut out
+# of the variable font with fontTools and handed to Qt as a font of its own.
+# fontTools is optional; without it the sliders are shown but disabled.
+#
+# Instancing a whole font takes seconds for a big one, so the font is first
+# subset to the characters of the specimen (once per font and text) and only
+# that small font is instanced for each slider position.
+
+FINE_AXIS_RANGE = 50      # axes narrower than this move in steps of 0.1
+
+# Tables fontTools cannot subset are dropped with a warning for every font
+logging.getLogger("fontTools.subset").setLevel(logging.ERROR)
+
+
+def available():
+    return instancer is not None
+
+
+def axis_scale(axis):
+    # Slider units per axis unit
+    return 10 if axis["max"] - axis["min"] < FINE_AXIS_RANGE else 1
+
+
+def _rename(font, family):
+    # A unique family, so Qt never confuses the instance with the file it came
+    # from or with another instance
+    name = font["name"]
+    for name_id in (1, 2, 4, 6, 16, 17, 21, 22, 25):
+        name.removeNames(nameID=name_id)
+    postscript = "".join(c for c in family if c.isalnum())[:63]
+    for name_id, value in ((1, family), (2, "Regular"), (4, family), (6, postscript)):
+        name.setName(value, name_id, 3, 1, 0x409)
+
+
+class InstanceBuilder:
+    # Keeps the subset of the last font it was asked for, so moving a slider
+    # only pays for instancing the subset. Meant for a single worker thread.
+
+    def __init__(self):
+        self._key = None
+        self._data = None
+
+    def _subset(self, path, face_index, text):
+        options = subset.Options()
+        options.layout_features = ["*"]
+        options.name_IDs = ["*"]
+        options.name_languages = ["*"]
+        options.notdef_outline = True
+        font = TTFont(archives.open_file(path), fontNumber=face_index)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(text=text)
+        subsetter.subset(font)
+        out = io.BytesIO()
+        font.save(out)
+        font.close()
+        return out.getvalue()
+
+    def build(self, path, face_index, text, coords, family):
+        # Returns the instance at coords ({tag: value}) as font file data
+        key = (path, face_index, archives.getmtime(path), text)
+        if key != self._key:
+            self._key = None
+            self._data = self._subset(path, face_index, text)
+            self._key = key
+        font = TTFont(io.BytesIO(self._data))
+        instancer.instantiateVariableFont(font, coords, inplace=True)
+        _rename(font, family)
+        out = io.BytesIO()
+        font.save(out)
+        return out.getvalue()
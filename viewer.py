@@ -0,0 +1,2777 @@
+#!/usr/bin/env python3
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from array import array
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                             QHBoxLayout, QListView, QLabel, QPushButton,
+                             QLineEdit, QTextEdit, QInputDialog, QMessageBox,
+                             QStyle, QSplitter, QProgressDialog,
+                             QComboBox, QDialog, QGridLayout, QSlider,
+                             QTreeWidget, QTreeWidgetItem, QShortcut, QFileDialog,
+                             QStyledItemDelegate, QScrollArea, QBoxLayout, QSizePolicy)
+from PyQt5.QtCore import (Qt, QDir, QTimer, QThread, pyqtSignal,
+                          QAbstractListModel, QModelIndex, QObject, QSize, QPoint, QRect,
+                          QRectF, QFileSystemWatcher)
+from PyQt5.QtNetwork import QLocalServer
+from PyQt5.QtGui import (QFontDatabase, QColor, QPalette,
+                         QTextDocument, QPixmap, QPixmapCache, QKeySequence,
+                         QFont, QPainter)
+
+from config import (ROOT_PATH, FONT_EXTENSIONS, COLLECTION_EXTENSIONS, SYSTEM_FONT_PATH,
+                    USER_FONT_PATHS, SINGLE_INSTANCE)
+import session
+import tracing
+import archives
+from specimen import SpecimenDocument, DEFAULT_HEADING, SPECIMEN_BODY, SPECIMEN_ENDING
+from font_index import FontIndex
+from font_meta import (MetadataExtractor, FontFormatError, read_codepoints, read_axes, read_faces,
+                       extract_face, block_ranges)
+import variations
+import thumbnails
+from font_hashes import HashCache, InstallIndex, find_duplicates
+
+# --- Configuration ---
+INSTALL_REFRESH_INTERVAL_S = 30
+SEARCH_DEBOUNCE_MS = 150
+FONT_CACHE_MAX_FONTS = 200
+FONT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PREVIEW_CACHE_SIZE = 32
+DIR_CACHE_SIZE = 64
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_HEIGHT = 64
+THUMBNAIL_PIXMAP_CACHE_KB = 64 * 1024
+WATCH_DEBOUNCE_MS = 300
+WATCH_MAX_DELAY_MS = 2000
+WATCH_POLL_INTERVAL_S = 5
+ZOOM_FRAME_MS = 16
+OVERLAY_REFRESH_MS = 500
+GLYPH_TILE_WIDTH = 72
+GLYPH_TILE_HEIGHT = 84
+GLYPH_PIXEL_SIZE = 40
+INSTANCE_CACHE_MAX_FONTS = 48
+INSTANCE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+PREFETCH_AHEAD = 4                          # rows in the direction of travel
+PREFETCH_BEHIND = 1
+PREFETCH_MAX_BYTES = 32 * 1024 * 1024       # read ahead per move
+PREFETCH_MAX_FONT_BYTES = 8 * 1024 * 1024   # bigger fonts are only loaded on demand
+COMPARE_MAX_PANES = 12
+COMPARE_COLUMN_WIDTH = 420
+
+class EditTextDialog(QDialog):
+    def __init__(self, current_text, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Edit Heading Text")
+        self.resize(400, 200)
+        self.new_text = current_text
+        self.is_reset = False
+
+        layout = QVBoxLayout(self)
+
+        self.text_edit = QTextEdit()
+        self.text_edit.setPlainText(current_text)
+        layout.addWidget(self.text_edit)
+
+        btn_layout = QHBoxLayout()
+
+        btn_ok = QPushButton("Apply")
+        btn_ok.clicked.connect(self.accept)
+
+        btn_reset = QPushButton("Reset to Default")
+        btn_reset.setStyleSheet("color: #aa3333;")
+        btn_reset.clicked.connect(self.reset_text)
+
+        btn_cancel = QPushButton("Cancel")
+        btn_cancel.clicked.connect(self.reject)
+
+        btn_layout.addWidget(btn_ok)
+        btn_layout.addWidget(btn_reset)
+        btn_layout.addWidget(btn_cancel)
+
+        layout.addLayout(btn_layout)
+
+    def reset_text(self):
+        self.is_reset = True
+        self.accept()
+
+    def get_text(self):
+        if self.is_reset:
+            return None
+        return self.text_edit.toPlainText()
+
+class FontCache:
+    # Application fonts registered with QFontDatabase, keyed by (path, mtime).
+    # Clicking a font again reuses its id; past the count or byte budget the least
+    # recently used fonts are removed from the database again.
+
+    def __init__(self, max_fonts=FONT_CACHE_MAX_FONTS, max_bytes=FONT_CACHE_MAX_BYTES):
+        self.max_fonts = max_fonts
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (font_id, families, size)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.on_evict = None
+
+    def load(self, path):
+        # Returns (font_id, families); font_id is -1 if Qt could not load the file.
+        # A font inside an archive is read only when it is not registered yet.
+        if archives.split(path):
+            key = (path, archives.getmtime(path))
+            return self.lookup(key) or self.load_data(key, archives.read_member(path))
+        st = os.stat(path)
+        return self._register((path, st.st_mtime), st.st_size,
+                              lambda: QFontDatabase.addApplicationFont(path))
+
+    def load_face(self, path, face_index):
+        # One face of a collection. Only that face's tables are read, and only
+        # when it is not registered yet; the rest of the file is never loaded.
+        key = ((path, face_index), archives.getmtime(path))
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry
+        return self.load_data(key, extract_face(path, face_index))
+
+    def load_data(self, key, data):
+        # Fonts that only exist in memory, e.g. variable font instances
+        return self._register(key, len(data), lambda: QFontDatabase.addApplicationFontFromData(data))
+
+    def has_path(self, path):
+        return any(key[0] == path for key in self._entries)
+
+    def lookup(self, key):
+        # (font_id, families) if key is registered, without loading anything
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    def _register(self, key, size, add_font):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+        self.misses += 1
+        # A file that changed on disk replaces its previous registration
+        for old_key in [k for k in self._entries if k[0] == key[0]]:
+            self._remove(old_key)
+
+        with tracing.span("register_font", path=key[0], bytes=size):
+            font_id = add_font()
+            if font_id == -1:
+                return -1, []
+            families = QFontDatabase.applicationFontFamilies(font_id)
+        self._entries[key] = (font_id, families, size)
+        self.total_bytes += size
+        self._evict()
+        return font_id, families
+
+    def _remove(self, key):
+        font_id, families, size = self._entries.pop(key)
+        self.total_bytes -= size
+        QFontDatabase.removeApplicationFont(font_id)
+        if self.on_evict:
+            self.on_evict(families)
+
+    def _evict(self):
+        # The newest entry is always kept, even if it alone is over budget
+        while len(self._entries) > 1 and (len(self._entries) > self.max_fonts
+                                          or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self):
+        for key in list(self._entries):
+            self._remove(key)
+
+    def stats(self):
+        return {
+            "fonts": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+class PreviewCache:
+    # Most recently used specimen documents, so toggling caps or going back to a
+    # previous style does not rebuild anything
+
+    def __init__(self, parent, max_docs=PREVIEW_CACHE_SIZE):
+        self.parent = parent
+        self.max_docs = max_docs
+        self._docs = OrderedDict()   # (family, style, heading, caps) -> SpecimenDocument
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, family, style, heading, caps, zoom):
+        key = (family, style, heading, caps)
+        specimen = self._docs.get(key)
+        if specimen is not None:
+            self.hits += 1
+            self._docs.move_to_end(key)
+            specimen.set_zoom(zoom)
+            return specimen
+
+        self.misses += 1
+        display_heading = heading.upper() if caps else heading
+        with tracing.span("build_document", family=family, style=style):
+            specimen = SpecimenDocument(family, style, display_heading, zoom, self.parent)
+        self._docs[key] = specimen
+        while len(self._docs) > self.max_docs:
+            _, old = self._docs.popitem(last=False)
+            old.doc.deleteLater()
+        return specimen
+
+    def __len__(self):
+        return len(self._docs)
+
+    def discard_families(self, families):
+        # Called when fonts are released, their documents would fall back to other fonts
+        for key in [k for k in self._docs if k[0] in families]:
+            self._docs.pop(key).doc.deleteLater()
+
+class FileListModel(QAbstractListModel):
+    # Sidebar entries kept in parallel arrays (names, flags, relative paths)
+    # instead of one item object per row. The view only asks for visible rows,
+    # and every row of a kind shares the same icon.
+    FLAG_DIR = 1
+    FLAG_FONT = 2
+    FLAG_ERROR = 4
+    FLAG_FACE = 8               # one face of the collection listed above it
+    FLAG_ARCHIVE = 16           # a zip archive, browsed like a folder
+
+    def __init__(self, icons, parent=None):
+        super().__init__(parent)
+        self.icons = icons          # flag -> QIcon
+        self._names = []
+        self._flags = array("B")
+        self._paths = []            # path relative to the root, "" when not needed
+        self._faces = array("h")    # face index of FLAG_FACE rows, -1 otherwise
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        if not index.isValid() or row >= len(self._names):
+            return None
+        if role == Qt.DisplayRole:
+            return self._names[row]
+        if role == Qt.DecorationRole:
+            return self.icons.get(self._flags[row])
+        if role == Qt.ToolTipRole:
+            return self._paths[row] or None
+        if role == Qt.ForegroundRole and self._flags[row] & self.FLAG_ERROR:
+            return QColor("red")
+        return None
+
+    def name(self, row):
+        return self._names[row]
+
+    def flags_at(self, row):
+        return self._flags[row]
+
+    def path(self, row):
+        return self._paths[row]
+
+    def face(self, row):
+        return self._faces[row]
+
+    def set_entries(self, names, flags, paths=None):
+        self.beginResetModel()
+        self._names = list(names)
+        self._flags = array("B", flags)
+        self._paths = list(paths) if paths is not None else [""] * len(self._names)
+        self._faces = array("h", [-1]) * len(self._names)
+        self.endResetModel()
+
+    def append_entries(self, names, flags, paths=None):
+        if not names:
+            return
+        first = len(self._names)
+        self.beginInsertRows(QModelIndex(), first, first + len(names) - 1)
+        self._names.extend(names)
+        self._flags.extend(flags)
+        self._paths.extend(paths if paths is not None else [""] * len(names))
+        self._faces.extend(array("h", [-1]) * len(names))
+        self.endInsertRows()
+
+    def insert_faces(self, row, names, path):
+        # Lists the faces of the collection at row right below it
+        if not names:
+            return
+        self.beginInsertRows(QModelIndex(), row + 1, row + len(names))
+        self._names[row + 1:row + 1] = names
+        self._flags[row + 1:row + 1] = array("B", [self.FLAG_FACE]) * len(names)
+        self._paths[row + 1:row + 1] = [path] * len(names)
+        self._faces[row + 1:row + 1] = array("h", range(len(names)))
+        self.endInsertRows()
+
+    def remove_faces(self, row):
+        # Collapses the collection at row again; returns False if it was not expanded
+        end = row + 1
+        while end < len(self._names) and self._flags[end] & self.FLAG_FACE:
+            end += 1
+        if end == row + 1:
+            return False
+        self.beginRemoveRows(QModelIndex(), row + 1, end - 1)
+        del self._names[row + 1:end]
+        del self._flags[row + 1:end]
+        del self._paths[row + 1:end]
+        del self._faces[row + 1:end]
+        self.endRemoveRows()
+        return True
+
+    def clear(self):
+        self.set_entries([], [])
+
+    def snapshot(self):
+        # The listing without expanded collections
+        rows = [i for i, flag in enumerate(self._flags) if not flag & self.FLAG_FACE]
+        return [self._names[i] for i in rows], array("B", (self._flags[i] for i in rows))
+
+    def sort(self, column=0, order=Qt.AscendingOrder):
+        # Folders first, then case-insensitive by name; done on the arrays. Faces
+        # stay below their collection.
+        names = self._names
+        flags = self._flags
+        faces = self._faces
+
+        def key(i):
+            if flags[i] & self.FLAG_FACE:
+                return (True, os.path.basename(self._paths[i]).lower(), faces[i])
+            return (not flags[i] & (self.FLAG_DIR | self.FLAG_ARCHIVE), names[i].lower(), -1)
+
+        order_idx = sorted(range(len(names)), key=key, reverse=order == Qt.DescendingOrder)
+        self.layoutAboutToBeChanged.emit()
+        self._names = [names[i] for i in order_idx]
+        self._flags = array("B", (flags[i] for i in order_idx))
+        self._paths = [self._paths[i] for i in order_idx]
+        self._faces = array("h", (faces[i] for i in order_idx))
+        # Selections and the current index made while the scan streamed in
+        # follow their rows
+        persistent = self.persistentIndexList()
+        if persistent:
+            new_row = [0] * len(order_idx)
+            for row, old in enumerate(order_idx):
+                new_row[old] = row
+            self.changePersistentIndexList(persistent,
+                                           [self.index(new_row[i.row()]) for i in persistent])
+        self.layoutChanged.emit()
+
+class DirectoryScanner(QThread):
+    # Lists one directory at a time off the GUI thread with os.scandir, using the
+    # entry type from the directory listing instead of a stat per file. The first
+    # screenful is sent as soon as it is found; a newer request cancels the old one.
+    # Folders inside zip archives come from the archive's cached central directory.
+    entries_found = pyqtSignal(int, list, object)
+    scan_finished = pyqtSignal(int, str, float, str)
+
+    FIRST_BATCH = 100
+    BATCH_SIZE = 2000
+
+    def __init__(self, extensions, parent=None):
+        super().__init__(parent)
+        self.extensions = extensions
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._request = None
+        self._stopping = False
+
+    def scan(self, path):
+        with self._cond:
+            self._generation += 1
+            self._request = (self._generation, path)
+            self._cond.notify()
+            return self._generation
+
+    def cancel(self):
+        with self._cond:
+            self._generation += 1
+            self._request = None
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._generation += 1
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not (self._stopping or self._request):
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                generation, path = self._request
+                self._request = None
+            with tracing.span("scan_directory", path=path) as span:
+                span.set(count=self._scan(generation, path))
+
+    def _scan(self, generation, path):
+        # Returns the number of entries listed
+        names = []
+        flags = array("B")
+        count = 0
+        batch_size = self.FIRST_BATCH
+        try:
+            if archives.split(path):
+                return self._scan_archive(generation, path)
+            mtime = os.stat(path).st_mtime
+            with os.scandir(path) as it:
+                for entry in it:
+                    if generation != self._generation:
+                        return count
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        names.append(entry.name)
+                        flags.append(FileListModel.FLAG_DIR)
+                    elif archives.is_archive(entry.name):
+                        names.append(entry.name)
+                        flags.append(FileListModel.FLAG_ARCHIVE)
+                    elif entry.name.lower().endswith(self.extensions):
+                        names.append(entry.name)
+                        flags.append(FileListModel.FLAG_FONT)
+                    else:
+                        continue
+                    if len(names) >= batch_size:
+                        count += len(names)
+                        self.entries_found.emit(generation, names, flags)
+                        names = []
+                        flags = array("B")
+                        batch_size = self.BATCH_SIZE
+        except PermissionError:
+            self.scan_finished.emit(generation, path, 0.0, "Permission Denied")
+            return count
+        except OSError as e:
+            self.scan_finished.emit(generation, path, 0.0, e.strerror or str(e))
+            return count
+
+        count += len(names)
+        if generation != self._generation:
+            return count
+        if names:
+            self.entries_found.emit(generation, names, flags)
+        self.scan_finished.emit(generation, path, mtime, "")
+        return count
+
+    def _scan_archive(self, generation, path):
+        # Raises OSError like os.scandir
+        mtime = archives.getmtime(path)
+        subdirs, files = archives.list_dir(path)
+        names = subdirs + [name for name in files if name.lower().endswith(self.extensions)]
+        flags = array("B", [FileListModel.FLAG_DIR]) * len(subdirs)
+        flags.extend([FileListModel.FLAG_FONT] * (len(names) - len(subdirs)))
+        if generation != self._generation:
+            return len(names)
+        if names:
+            self.entries_found.emit(generation, names, flags)
+        self.scan_finished.emit(generation, path, mtime, "")
+        return len(names)
+
+class FontPrefetcher(QObject):
+    # Reads the fonts next to the current sidebar row on a background thread,
+    # so the GUI thread only has to register them. A newer request makes the
+    # one in flight stop at its next file.
+    font_read = pyqtSignal(int, str, float, object)   # generation, path, mtime, data
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.generation = 0
+
+    def request(self, paths):
+        self.generation += 1
+        self._executor.submit(self._read, self.generation, paths)
+        return self.generation
+
+    def _read(self, generation, paths):
+        budget = PREFETCH_MAX_BYTES
+        for path in paths:
+            if generation != self.generation:
+                return
+            try:
+                size = archives.stat(path)[0]
+                if size > PREFETCH_MAX_FONT_BYTES or size > budget:
+                    continue
+                budget -= size
+                mtime = archives.getmtime(path)
+                data = archives.read_bytes(path)
+            except OSError:
+                continue
+            self.font_read.emit(generation, path, mtime, data)
+
+    def shutdown(self):
+        self.generation += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class ThumbnailRenderer(QObject):
+    # Hands thumbnail requests to a process pool. The newest request is rendered
+    # first, so whatever is on screen right now wins over rows scrolled past, and
+    # requests the view no longer shows are dropped before they reach a worker.
+    thumbnail_ready = pyqtSignal(str, str)
+    request_dropped = pyqtSignal(str)
+    _render_done = pyqtSignal(str, int, float, str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cache = thumbnails.ThumbnailCache()
+        self.text = ""
+        self.width = THUMBNAIL_WIDTH
+        self.height = THUMBNAIL_HEIGHT
+        self.is_wanted = None
+        self._pool = None
+        self._pending = OrderedDict()   # path -> (size, mtime)
+        self._in_flight = set()
+        self._max_in_flight = (os.cpu_count() or 1) * 2
+        self._render_done.connect(self._on_render_done)
+        # Requests come from the model's data(); they are dispatched once the view
+        # is done painting, as a drop reported from inside data() would reach the
+        # model before it has stored the row, and the cell would never be requested again
+        self._dispatch_timer = QTimer(self)
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.setInterval(0)
+        self._dispatch_timer.timeout.connect(self._dispatch)
+
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self._pending.clear()
+
+    def clear_pending(self):
+        self._pending.clear()
+
+    def request(self, path):
+        # Returns the cached png path, "" if the file is unusable, or None once queued
+        try:
+            size, mtime = archives.stat(path)
+        except OSError:
+            return ""
+        png_path = self.cache.lookup(path, size, mtime, self.text, self.width, self.height)
+        if png_path:
+            return png_path
+        self._pending[path] = (size, mtime)
+        self._pending.move_to_end(path)
+        if not self._dispatch_timer.isActive():
+            self._dispatch_timer.start()
+        return None
+
+    def _dispatch(self):
+        while self._pending and len(self._in_flight) < self._max_in_flight:
+            path, (size, mtime) = self._pending.popitem(last=True)
+            if path in self._in_flight:
+                continue
+            if self.is_wanted and not self.is_wanted(path):
+                self.request_dropped.emit(path)
+                continue
+            if self._pool is None:
+                self._pool = thumbnails.create_pool()
+            text = self.text
+            future = self._pool.submit(thumbnails.render_thumbnail, path, text,
+                                       self.width, self.height)
+            self._in_flight.add(path)
+            future.add_done_callback(
+                lambda f, p=path, s=size, m=mtime, t=text: self._render_done.emit(p, s, m, t, f))
+
+    def _on_render_done(self, path, size, mtime, text, future):
+        self._in_flight.discard(path)
+        png_path = ""
+        try:
+            digest, png_path = future.result()
+            self.cache.remember(path, size, mtime, digest)
+        except BrokenProcessPool:
+            self._pool = None
+        except Exception as e:
+            print(f"Error rendering thumbnail: {e}")
+
+        if text == self.text:
+            self.thumbnail_ready.emit(path, png_path or "")
+        self._dispatch()
+
+    def shutdown(self):
+        self._pending.clear()
+        self._dispatch_timer.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self.cache.close()
+
+class SpecimenWallModel(QAbstractListModel):
+    # One cell per font of the current listing. A thumbnail is only requested when
+    # the view asks for the cell's decoration, i.e. when the cell is painted.
+
+    def __init__(self, renderer, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self._names = []
+        self._paths = []
+        self._rows = {}      # path -> row
+        self._thumbs = {}    # row -> png path, "" if unusable, None while rendering
+        renderer.thumbnail_ready.connect(self.on_thumbnail_ready)
+        renderer.request_dropped.connect(self.forget)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        if not index.isValid() or row >= len(self._names):
+            return None
+        if role == Qt.DisplayRole:
+            return self._names[row]
+        if role == Qt.ToolTipRole:
+            return self._paths[row]
+        if role == Qt.DecorationRole:
+            if row not in self._thumbs:
+                self._thumbs[row] = self.renderer.request(self._paths[row])
+            png_path = self._thumbs[row]
+            if not png_path:
+                return None
+            pixmap = QPixmapCache.find(png_path)
+            if pixmap is None:
+                pixmap = QPixmap(png_path)
+                QPixmapCache.insert(png_path, pixmap)
+            return pixmap
+        return None
+
+    def path(self, row):
+        return self._paths[row]
+
+    def row_of(self, path):
+        return self._rows.get(path, -1)
+
+    def set_entries(self, names, paths):
+        self.beginResetModel()
+        self._names = list(names)
+        self._paths = list(paths)
+        self._rows = {path: row for row, path in enumerate(self._paths)}
+        self._thumbs = {}
+        self.renderer.clear_pending()
+        self.endResetModel()
+
+    def reset_thumbnails(self):
+        self._thumbs = {}
+        if self._names:
+            self.dataChanged.emit(self.index(0), self.index(len(self._names) - 1),
+                                  [Qt.DecorationRole])
+
+    def on_thumbnail_ready(self, path, png_path):
+        row = self._rows.get(path)
+        if row is None:
+            return
+        self._thumbs[row] = png_path
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def forget(self, path):
+        row = self._rows.get(path)
+        if row is not None and self._thumbs.get(row, "") is None:
+            del self._thumbs[row]
+
+class GlyphGridModel(QAbstractListModel):
+    # The codepoints of the selected font, one cell each, kept in a flat array.
+    # Nothing is drawn here; the delegate renders only the cells being painted.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._codepoints = array("I")
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._codepoints)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        if not index.isValid() or row >= len(self._codepoints):
+            return None
+        if role == Qt.UserRole:
+            return self._codepoints[row]
+        if role == Qt.ToolTipRole:
+            cp = self._codepoints[row]
+            return f"U+{cp:04X} {unicodedata.name(chr(cp), '')}"
+        return None
+
+    def set_codepoints(self, codepoints):
+        self.beginResetModel()
+        self._codepoints = codepoints
+        self.endResetModel()
+
+class GlyphDelegate(QStyledItemDelegate):
+    # Paints glyph tiles from QPixmapCache, rendering a tile the first time it
+    # scrolls into view. Font merging is off, so a tile never shows a glyph
+    # borrowed from another font.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.glyph_font = None
+        self.key = ""
+        self.label_font = QFont("sans-serif")
+        self.label_font.setPixelSize(10)
+
+    def set_font(self, family, style, source):
+        # source is the (path, face, mtime) the font was loaded from, so fonts that
+        # share a family and style name never share tiles
+        self.glyph_font = QFontDatabase().font(family, style, GLYPH_PIXEL_SIZE)
+        self.glyph_font.setPixelSize(GLYPH_PIXEL_SIZE)
+        self.glyph_font.setStyleStrategy(QFont.NoFontMerging)
+        path, face, mtime = source
+        self.key = f"glyph/{path}/{face}/{mtime}/{family}/{style}"
+
+    def sizeHint(self, option, index):
+        return QSize(GLYPH_TILE_WIDTH, GLYPH_TILE_HEIGHT)
+
+    def paint(self, painter, option, index):
+        cp = index.data(Qt.UserRole)
+        if cp is None or self.glyph_font is None:
+            return
+        ratio = painter.device().devicePixelRatioF()
+        key = f"{self.key}/{cp}/{ratio}"
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None:
+            pixmap = self.render_tile(cp, ratio)
+            QPixmapCache.insert(key, pixmap)
+        painter.drawPixmap(option.rect.topLeft(), pixmap)
+        if option.state & QStyle.State_Selected:
+            painter.setPen(QColor(42, 130, 218))
+            painter.drawRect(option.rect.adjusted(0, 0, -1, -1))
+
+    def render_tile(self, cp, ratio):
+        pixmap = QPixmap(int(GLYPH_TILE_WIDTH * ratio), int(GLYPH_TILE_HEIGHT * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QColor("#2d2d2d"))
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        painter.setPen(QColor("white"))
+        painter.setFont(self.glyph_font)
+        glyph_height = GLYPH_TILE_HEIGHT - 18
+        painter.drawText(QRect(0, 0, GLYPH_TILE_WIDTH, glyph_height), Qt.AlignCenter, chr(cp))
+        painter.setPen(QColor("#888888"))
+        painter.setFont(self.label_font)
+        painter.drawText(QRect(0, glyph_height, GLYPH_TILE_WIDTH, 16), Qt.AlignCenter, f"{cp:04X}")
+        painter.end()
+        return pixmap
+
+class DirectoryWatcher(QObject):
+    # Reports changed directories of the collection in coalesced batches. Uses
+    # QFileSystemWatcher (inotify) where it can; directories it refuses, e.g. past
+    # the inotify watch limit or on filesystems without notifications, are polled
+    # for mtime changes from a background thread instead.
+    directories_changed = pyqtSignal(object)
+    _polled_change = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_changed)
+        self._polled_change.connect(self._on_changed)
+
+        self._polled = {}       # path -> last seen mtime
+        self._polled_lock = threading.Lock()
+        self._poll_stop = threading.Event()
+        self._poll_thread = None
+
+        # An event storm (e.g. unpacking an archive) becomes one batch: the timer
+        # restarts on every event, but never holds changes back for longer than
+        # WATCH_MAX_DELAY_MS
+        self._pending = set()
+        self._first_event = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(WATCH_DEBOUNCE_MS)
+        self.timer.timeout.connect(self._flush)
+
+    def set_directories(self, paths):
+        wanted = set(paths)
+        watched = set(self.watcher.directories())
+        with self._polled_lock:
+            polled = set(self._polled)
+
+        stale = watched - wanted
+        if stale:
+            self.watcher.removePaths(sorted(stale))
+        new = wanted - watched - polled
+        failed = self.watcher.addPaths(sorted(new)) if new else []
+
+        with self._polled_lock:
+            for path in polled - wanted:
+                del self._polled[path]
+            for path in failed:
+                try:
+                    self._polled[path] = os.stat(path).st_mtime
+                except OSError:
+                    continue
+            need_polling = bool(self._polled)
+
+        if need_polling and self._poll_thread is None:
+            self._poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self._poll_thread.start()
+
+    def _poll_loop(self):
+        while not self._poll_stop.wait(WATCH_POLL_INTERVAL_S):
+            with self._polled_lock:
+                items = list(self._polled.items())
+            for path, mtime in items:
+                try:
+                    new_mtime = os.stat(path).st_mtime
+                except OSError:
+                    new_mtime = None
+                if new_mtime != mtime:
+                    with self._polled_lock:
+                        if path in self._polled:
+                            self._polled[path] = new_mtime
+                    self._polled_change.emit(path)
+
+    def _on_changed(self, path):
+        self._pending.add(os.path.normpath(path))
+        now = time.monotonic()
+        if self._first_event is None:
+            self._first_event = now
+        if (now - self._first_event) * 1000 >= WATCH_MAX_DELAY_MS:
+            self._flush()
+        else:
+            self.timer.start()
+
+    def _flush(self):
+        self.timer.stop()
+        changed = self._pending
+        self._pending = set()
+        self._first_event = None
+        if changed:
+            self.directories_changed.emit(changed)
+
+    def stop(self):
+        self._poll_stop.set()
+        self.timer.stop()
+
+class InstallWorker(QThread):
+    # Installs a batch of fonts with a single sudo call: the file list goes through
+    # a temporary file, the script reports each copied file on stdout, and only
+    # the target directory's fontconfig cache is refreshed afterwards.
+    progress = pyqtSignal(int, int, str)
+    install_finished = pyqtSignal(int, int, str)
+
+    INSTALL_SCRIPT = r"""
+dest="$1"
+status=0
+while IFS= read -r -d '' f; do
+    # Never replace a file that showed up in the destination meanwhile
+    [ -e "$dest/${f##*/}" ] && continue
+    if cp -n -- "$f" "$dest/"; then
+        printf '%s\n' "${f##*/}"
+    else
+        status=1
+    fi
+done < "$2"
+fc-cache "$dest" || status=1
+exit $status
+"""
+
+    def __init__(self, sources, dest, password, install_index, parent=None):
+        super().__init__(parent)
+        self.sources = sources
+        self.dest = dest
+        self.password = password
+        self.install_index = install_index
+        self.unpack_dir = None
+
+    def _should_skip(self, path, queued):
+        # Already installed somewhere (by content), a different font already owns
+        # the file name in the destination, or an earlier font in this batch does
+        name = os.path.basename(path)
+        if name in queued or os.path.exists(os.path.join(self.dest, name)):
+            return True
+        return self.install_index.find_installed(path) is not None
+
+    def _collect(self):
+        fonts = []
+        for source in self.sources:
+            if os.path.isdir(source) or archives.split(source) and not source.lower().endswith(FONT_EXTENSIONS):
+                walk = archives.walk if archives.split(source) else os.walk
+                for root, dirs, files in walk(source):
+                    dirs.sort(key=str.lower)
+                    for file in sorted(files, key=str.lower):
+                        if file.lower().endswith(FONT_EXTENSIONS):
+                            fonts.append(os.path.join(root, file))
+            elif source.lower().endswith(FONT_EXTENSIONS):
+                fonts.append(source)
+        return fonts
+
+    def _unpack(self, fonts):
+        # The install script copies real files, so fonts inside archives are
+        # written to a temporary folder first, each in its own subfolder to keep
+        # its file name
+        unpacked = []
+        for path in fonts:
+            if not archives.split(path):
+                unpacked.append(path)
+                continue
+            if self.unpack_dir is None:
+                self.unpack_dir = tempfile.mkdtemp(prefix="font-fragrance-")
+            folder = os.path.join(self.unpack_dir, str(len(unpacked)))
+            os.makedirs(folder)
+            target = os.path.join(folder, os.path.basename(path))
+            with open(target, "wb") as f:
+                f.write(archives.read_member(path, cache=False))
+            unpacked.append(target)
+        return unpacked
+
+    def run(self):
+        try:
+            self._install()
+        finally:
+            if self.unpack_dir is not None:
+                shutil.rmtree(self.unpack_dir, ignore_errors=True)
+
+    def _install(self):
+        with tracing.span("install_check") as span:
+            try:
+                fonts = self._unpack(self._collect())
+            except OSError as e:
+                self.install_finished.emit(0, 0, str(e))
+                return
+            self.install_index.refresh()
+            todo = []
+            queued = set()
+            for path in fonts:
+                if not self._should_skip(path, queued):
+                    todo.append(path)
+                    queued.add(os.path.basename(path))
+            span.set(count=len(fonts))
+        skipped = len(fonts) - len(todo)
+        self.progress.emit(0, len(todo), "")
+        if not todo:
+            self.install_finished.emit(0, skipped, "")
+            return
+
+        fd, list_path = tempfile.mkstemp(prefix="font-fragrance-", suffix=".list")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"".join(os.fsencode(path) + b"\0" for path in todo))
+
+            proc = subprocess.Popen(['sudo', '-S', '-p', '', 'bash', '-c', self.INSTALL_SCRIPT,
+                                     'install-fonts', self.dest, list_path],
+                                    stdin=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    stdout=subprocess.PIPE)
+            proc.stdin.write(self.password.encode() + b"\n")
+            proc.stdin.close()
+
+            stderr = []
+            err_reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()))
+            err_reader.start()
+
+            done = 0
+            with tracing.span("install_copy", count=len(todo), dest=self.dest):
+                for line in proc.stdout:
+                    done += 1
+                    self.progress.emit(done, len(todo), line.decode(errors="replace").rstrip("\n"))
+                proc.wait()
+                err_reader.join()
+
+            error = ""
+            if proc.returncode != 0:
+                error = b"".join(stderr).decode(errors="replace").strip() or "Installation failed."
+            self.install_finished.emit(done, skipped, error)
+
+        except Exception as e:
+            self.install_finished.emit(0, skipped, str(e))
+        finally:
+            os.remove(list_path)
+
+class SearchWorker(QThread):
+    # Runs index refreshes and searches off the GUI thread. Only the latest query
+    # matters: submitting a new one bumps the generation, which makes the query in
+    # flight stop at its next row. Results are streamed back in batches.
+    # Metadata extraction runs in chunks between queries, so a first index build
+    # never blocks searching by file name.
+    results_found = pyqtSignal(int, list)
+    search_finished = pyqtSignal(int, int)
+    index_refreshed = pyqtSignal(object)
+
+    FIRST_BATCH = 50
+    BATCH_SIZE = 500
+    MAX_RESULTS = 1000      # best matches listed; a longer query narrows them down
+    METADATA_CHUNK = 256
+
+    def __init__(self, font_index, parent=None):
+        super().__init__(parent)
+        self.font_index = font_index
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._query = None
+        self._refresh_pending = False
+        self._refresh_dirs = set()      # partial refresh, unless a full one is pending
+        self._metadata_pending = []
+        self._stopping = False
+        self.extractor = MetadataExtractor()
+
+    def submit(self, text):
+        with self._cond:
+            self._generation += 1
+            self._query = (self._generation, text)
+            self._cond.notify()
+            return self._generation
+
+    def cancel(self):
+        with self._cond:
+            self._generation += 1
+            self._query = None
+
+    def request_refresh(self, rel_dirs=None):
+        # Without rel_dirs the whole tree is checked
+        with self._cond:
+            if rel_dirs is None:
+                self._refresh_pending = True
+                self._refresh_dirs = set()
+            elif not self._refresh_pending:
+                self._refresh_dirs.update(rel_dirs)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._generation += 1
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        # The stored index is read here rather than in the window's constructor,
+        # so a large collection doesn't delay the first paint
+        self.font_index.load()
+        while True:
+            with self._cond:
+                while not (self._stopping or self._refresh_pending or self._refresh_dirs
+                           or self._query or self._metadata_pending):
+                    self._cond.wait()
+                if self._stopping:
+                    break
+                refresh = self._refresh_pending or bool(self._refresh_dirs)
+                refresh_dirs = None if self._refresh_pending else self._refresh_dirs
+                self._refresh_pending = False
+                self._refresh_dirs = set()
+                query = None if refresh else self._query
+                if query is not None:
+                    self._query = None
+
+            # A refresh always runs first, so a query typed during a cold start
+            # is answered from the up to date index
+            if refresh:
+                with tracing.span("index_refresh", partial=refresh_dirs is not None) as span:
+                    changed = self.font_index.refresh(refresh_dirs)
+                    span.set(count=len(changed))
+                with self._cond:
+                    self._metadata_pending = self.font_index.pending_metadata()
+                self.index_refreshed.emit(changed)
+            elif query is not None:
+                with tracing.span("search", query=query[1]) as span:
+                    span.set(count=self._run_query(*query))
+            else:
+                self._extract_metadata_chunk()
+
+        self.extractor.shutdown()
+
+    def _extract_metadata_chunk(self):
+        with self._cond:
+            chunk = self._metadata_pending[:self.METADATA_CHUNK]
+            del self._metadata_pending[:self.METADATA_CHUNK]
+            done = not self._metadata_pending
+        with tracing.span("extract_metadata", count=len(chunk)):
+            # A bad chunk is skipped, it must never end the search thread
+            try:
+                self.font_index.extract_metadata(chunk, self.extractor)
+            except BrokenProcessPool:
+                # A worker died; a new pool is started for the next chunk
+                self.extractor.shutdown()
+            except Exception as e:
+                print(f"Error reading font metadata: {e}")
+        if done:
+            # Re-run the visible search now that every file has metadata
+            self.extractor.shutdown()
+            self.index_refreshed.emit({""})
+
+    def _run_query(self, generation, text):
+        # Returns the number of results sent, or None if the query was superseded
+        batch = []
+        batch_size = self.FIRST_BATCH
+        count = 0
+        for row in self.font_index.search(text, self.MAX_RESULTS):
+            if generation != self._generation:
+                return None
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count += len(batch)
+                self.results_found.emit(generation, batch)
+                batch = []
+                batch_size = self.BATCH_SIZE
+
+        if generation != self._generation:
+            return None
+        if batch:
+            count += len(batch)
+            self.results_found.emit(generation, batch)
+        self.search_finished.emit(generation, count)
+        return count
+
+class DuplicatesDialog(QDialog):
+    def __init__(self, groups, root_path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Duplicate Fonts")
+        self.resize(700, 500)
+
+        layout = QVBoxLayout(self)
+
+        wasted = sum((len(g) - 1) * g[0][1] for g in groups)
+        summary = QLabel(f"{len(groups)} group(s) of identical files, "
+                         f"{wasted / (1024 * 1024):.1f} MB in redundant copies.")
+        layout.addWidget(summary)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["File", "Size"])
+        self.tree.setColumnWidth(0, 520)
+        for group in groups:
+            size = group[0][1]
+            top = QTreeWidgetItem([f"{len(group)} copies of {os.path.basename(group[0][0])}",
+                                   f"{size / 1024:.0f} KB"])
+            for path, _ in group:
+                child = QTreeWidgetItem([os.path.relpath(path, root_path), ""])
+                child.setData(0, Qt.UserRole, path)
+                top.addChild(child)
+            self.tree.addTopLevelItem(top)
+        self.tree.itemDoubleClicked.connect(self.open_item)
+        layout.addWidget(self.tree)
+
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(self.accept)
+        layout.addWidget(btn_close)
+
+    def open_item(self, item):
+        path = item.data(0, Qt.UserRole)
+        if path:
+            self.parent().load_font_file(path)
+
+class SpecimenView(QWidget):
+    # Paints a specimen document at the view's width, with the height of the
+    # document. It is only laid out again when its width or contents change.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.doc = None
+        self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
+
+    def set_document(self, doc):
+        self.doc = doc
+        self.relayout()
+
+    def relayout(self):
+        if self.doc is None:
+            return
+        if self.doc.textWidth() != self.width():
+            self.doc.setTextWidth(self.width())
+        self.setFixedHeight(int(self.doc.size().height()) + 1)
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if event.size().width() != event.oldSize().width():
+            self.relayout()
+
+    def paintEvent(self, event):
+        if self.doc is None:
+            return
+        painter = QPainter(self)
+        self.doc.drawContents(painter, QRectF(event.rect()))
+        painter.end()
+
+class ComparePane(QWidget):
+    # One pinned font or style in compare mode. Every pane owns its document, so
+    # a pane is only rebuilt when the text changes and only relaid out when its
+    # own width changes; a zoom change reformats the heading in place.
+    unpinned = pyqtSignal(object)
+
+    def __init__(self, path, face, family, style, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.face = face                 # None unless the font is a collection
+        self.family = family
+        self.style = style
+        self.specimen = None
+        self.text_key = None             # (heading, caps) the document was built for
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        title_row = QHBoxLayout()
+        title = QLabel(f"{family} \u00b7 {style}")
+        title.setStyleSheet("color: #888; font-weight: bold;")
+        title.setToolTip(path)
+        btn_unpin = QPushButton("Unpin")
+        btn_unpin.setStyleSheet("padding: 2px 8px; background-color: #444; color: white;")
+        btn_unpin.clicked.connect(lambda: self.unpinned.emit(self))
+        title_row.addWidget(title, 1)
+        title_row.addWidget(btn_unpin)
+        self.view = SpecimenView(self)
+        layout.addLayout(title_row)
+        layout.addWidget(self.view)
+        layout.addStretch(1)
+
+    def set_specimen(self, specimen, text_key):
+        old = self.specimen
+        self.specimen = specimen
+        self.text_key = text_key
+        self.view.set_document(specimen.doc)
+        if old is not None:
+            old.doc.deleteLater()
+
+    def set_columns(self, columns):
+        if columns:
+            self.setFixedWidth(COMPARE_COLUMN_WIDTH)
+        else:
+            self.setMinimumWidth(0)
+            self.setMaximumWidth(16777215)
+
+class PerformanceOverlay(QLabel):
+    # Tracing summary drawn over the canvas, refreshed while shown. Showing it
+    # turns tracing on; sample() supplies the cache and memory counters.
+
+    def __init__(self, sample, parent=None):
+        super().__init__(parent)
+        self.sample = sample
+        self.keep_tracing = tracing.enabled
+        self.setTextFormat(Qt.PlainText)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 190); color: #9f9; padding: 8px; "
+                           "font-family: monospace; font-size: 11px;")
+        self.timer = QTimer(self)
+        self.timer.setInterval(OVERLAY_REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def set_active(self, active):
+        tracing.set_enabled(active or self.keep_tracing)
+        self.setVisible(active)
+        if active:
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        counters = self.sample()
+        for name, values in counters.items():
+            tracing.counter(name, **values)
+
+        lines = [f"{'span':18s} {'calls':>6s} {'mean':>9s} {'max':>9s} {'last':>9s} {'items':>7s}"]
+        for name, calls, _, mean, longest, last, items in tracing.summary()[:12]:
+            lines.append(f"{name:18.18s} {calls:6d} {mean:7.1f}ms {longest:7.1f}ms {last:7.1f}ms {items:7d}")
+        lines.append("")
+        for name, values in counters.items():
+            lines.append(f"{name}: " + ", ".join(f"{k} {v}" for k, v in values.items()))
+        lines.append("F12 hide, Ctrl+F12 export trace")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+
+class FontViewerApp(QMainWindow):
+    install_state_ready = pyqtSignal(str, str)
+    glyphs_ready = pyqtSignal(object, object)
+    instance_ready = pyqtSignal(object, object)
+    duplicates_found = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+
+        self.root_path = ROOT_PATH
+        self.current_path = self.root_path
+        self.selected_font_path = None
+        self.selected_face = 0
+        self.search_mode = False
+        self.current_font_family = None
+
+        # --- State Variables ---
+        # Restored from the last session; see save_session()
+        self.state = session.load_state()
+        self.default_heading_text = DEFAULT_HEADING
+        self.heading_text = self.state.get("heading") or self.default_heading_text
+        self.is_caps = bool(self.state.get("caps", False))
+        self.zoom_level = min(200, max(50, int(self.state.get("zoom") or 100)))
+        self.restore_row = None
+
+        os.makedirs(self.root_path, exist_ok=True)
+        last_dir = self.state.get("directory")
+        if (isinstance(last_dir, str) and last_dir.startswith(self.root_path)
+                and (os.path.isdir(last_dir) or archives.split(last_dir))):
+            self.current_path = os.path.normpath(last_dir)
+            self.restore_row = self.state.get("row")
+
+        # --- Font Index ---
+        # Loaded from the on-disk cache on the search thread, then brought up to
+        # date once the window is up
+        self.font_index = FontIndex(self.root_path, FONT_EXTENSIONS)
+
+        self.font_cache = FontCache()
+        self.install_worker = None
+
+        # --- Install State ---
+        # Installed fonts are recognised by content, not by file name. Checks run
+        # on a single background thread so a font load never waits for hashing.
+        self.hash_cache = HashCache()
+        self.install_index = InstallIndex((SYSTEM_FONT_PATH,) + USER_FONT_PATHS,
+                                          FONT_EXTENSIONS, self.hash_cache)
+        self.install_checker = ThreadPoolExecutor(max_workers=1)
+        self.install_index_time = 0
+        self.install_state_ready.connect(self.on_install_state)
+
+        # --- Glyph Grid ---
+        # The cmap is read on its own thread; tiles are rendered as they are painted
+        self.glyph_loader = ThreadPoolExecutor(max_workers=1)
+        self.glyphs_ready.connect(self.on_glyphs_ready)
+        self.glyph_source = None          # (path, face, mtime) the grid was read from
+        self.glyph_codepoints = array("I")
+        self.glyph_blocks = []
+        self.duplicates_found.connect(self.on_duplicates_found)
+        self.install_checker.submit(self.install_index.load)
+        self.preview_cache = PreviewCache(self)
+        self.font_cache.on_evict = self.on_fonts_released
+
+        # --- Variable Font Axes ---
+        # Slider positions are coalesced into one instance per frame; instances
+        # are built one at a time on their own thread, the newest position wins.
+        # Built instances stay registered, so going back to a position is free.
+        self.axes = []
+        self.instances = []
+        self.axis_sliders = []
+        self.variation_face = None        # (family, style) of the instance on the canvas
+        self.instance_serial = 0
+        self.instance_building = False
+        self.failed_instance = None
+        self.instance_builder = variations.InstanceBuilder()
+        self.instance_worker = ThreadPoolExecutor(max_workers=1)
+        self.instance_ready.connect(self.on_instance_ready)
+        self.instance_cache = FontCache(INSTANCE_CACHE_MAX_FONTS, INSTANCE_CACHE_MAX_BYTES)
+        self.instance_cache.on_evict = self.preview_cache.discard_families
+        self.variation_timer = QTimer(self)
+        self.variation_timer.setSingleShot(True)
+        self.variation_timer.setInterval(ZOOM_FRAME_MS)
+        self.variation_timer.timeout.connect(self.apply_variation)
+
+        # --- Prefetching ---
+        # Moving through the sidebar previews each font; the fonts around the
+        # current row are read in the background, then registered and laid out
+        # one per event loop pass, so the next key press finds them ready
+        self.prefetcher = FontPrefetcher(self)
+        self.prefetcher.font_read.connect(self.on_font_prefetched)
+        self.prefetch_queue = deque()
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(0)
+        self.prefetch_timer.timeout.connect(self.prefetch_step)
+        self.current_row = -1
+
+        # --- Compare ---
+        # Pinned fonts share the heading, caps and zoom of the canvas; after a
+        # change, only panes whose document is out of date are updated, one per
+        # event loop pass and visible panes first
+        self.compare_panes = []
+        self.compare_pending = []
+        self.compare_timer = QTimer(self)
+        self.compare_timer.setSingleShot(True)
+        self.compare_timer.setInterval(0)
+        self.compare_timer.timeout.connect(self.compare_step)
+
+        # Slider ticks are coalesced into at most one heading update per frame
+        self.zoom_timer = QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(ZOOM_FRAME_MS)
+        self.zoom_timer.timeout.connect(self.apply_zoom)
+
+        self.search_worker = SearchWorker(self.font_index, self)
+        self.search_worker.results_found.connect(self.on_search_results)
+        self.search_worker.search_finished.connect(self.on_search_finished)
+        self.search_worker.index_refreshed.connect(self.on_index_refreshed)
+        self.search_worker.start()
+        self.search_generation = 0
+        self.search_text = ""
+
+        # --- Directory Listing ---
+        self.dir_scanner = DirectoryScanner(FONT_EXTENSIONS, self)
+        self.dir_scanner.entries_found.connect(self.on_dir_entries)
+        self.dir_scanner.scan_finished.connect(self.on_dir_scanned)
+        self.dir_scanner.start()
+        self.scan_generation = 0
+        self.dir_cache = OrderedDict()   # path -> (mtime, names, flags)
+        self.scan_buffer = None           # set while a listing is refreshed in place
+
+        # --- Filesystem Watching ---
+        self.dir_watcher = DirectoryWatcher(self)
+        self.dir_watcher.directories_changed.connect(self.on_directories_changed)
+
+        # --- Specimen Wall ---
+        self.thumbnail_renderer = ThumbnailRenderer(self)
+        self.wall_model = SpecimenWallModel(self.thumbnail_renderer, self)
+        self.wall_timer = QTimer(self)
+        self.wall_timer.setSingleShot(True)
+        self.wall_timer.setInterval(50)
+        self.wall_timer.timeout.connect(self.refresh_wall)
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), THUMBNAIL_PIXMAP_CACHE_KB))
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.start_search)
+
+        self.init_ui()
+
+        # --- "OPEN WITH" FEATURE ---
+        # A font passed as an argument is shown first, before the sidebar is
+        # listed; otherwise the font of the last session comes back
+        if not self.open_paths(sys.argv[1:]):
+            last_font = self.state.get("font")
+            if isinstance(last_font, str) and (os.path.isfile(last_font) or archives.split(last_font)):
+                face = self.state.get("face")
+                self.load_font_file(last_font, self.state.get("style"),
+                                    face if isinstance(face, int) and face > 0 else None)
+
+        # The sidebar is populated once the window is on screen
+        QTimer.singleShot(0, self.list_directory)
+        QTimer.singleShot(0, self.refresh_index)
+
+        # --- Single Instance ---
+        self.instance_server = None
+        if SINGLE_INSTANCE:
+            self.start_instance_server()
+
+    def open_paths(self, paths):
+        # Fonts and collection folders handed over on the command line or by a
+        # second launch. Returns True if a font was opened.
+        for path in paths:
+            if os.path.isdir(path) and os.path.normpath(path).startswith(self.root_path):
+                self.load_directory(path)
+            elif os.path.exists(path) and path.lower().endswith(FONT_EXTENSIONS):
+                # The style in use carries over to the new font when it has it
+                style = self.style_combo.currentText() if self.current_font_family else self.state.get("style")
+                self.load_font_file(path, style)
+                return True
+        return False
+
+    def start_instance_server(self):
+        # Whoever reaches this owns the socket: main.py already failed to connect,
+        # so a leftover socket file is stale
+        server = QLocalServer(self)
+        server.setSocketOptions(QLocalServer.UserAccessOption)
+        QLocalServer.removeServer(session.SOCKET_PATH)
+        if not server.listen(session.SOCKET_PATH):
+            print(f"Error starting instance server: {server.errorString()}")
+            return
+        server.newConnection.connect(self.on_instance_connection)
+        self.instance_server = server
+
+    def on_instance_connection(self):
+        while self.instance_server.hasPendingConnections():
+            conn = self.instance_server.nextPendingConnection()
+            buffer = bytearray()
+            conn.readyRead.connect(lambda c=conn, b=buffer: self.on_instance_data(c, b))
+            conn.disconnected.connect(conn.deleteLater)
+
+    def on_instance_data(self, conn, buffer):
+        buffer.extend(bytes(conn.readAll()))
+        if not session.request_complete(bytes(buffer)):
+            return
+        paths = session.decode_request(bytes(buffer))
+        conn.write(b"ok\n")
+        conn.flush()
+        conn.disconnectFromServer()
+
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        self.open_paths(paths)
+
+    def save_session(self):
+        top = self.file_list.indexAt(QPoint(0, 0))
+        style = self.style_combo.currentText() if self.current_font_family else None
+        session.save_state({
+            "directory": self.current_path,
+            "row": top.row() if top.isValid() and not self.search_mode else None,
+            "font": self.selected_font_path,
+            "face": self.selected_face,
+            "style": style,
+            "zoom": self.zoom_level,
+            "heading": None if self.heading_text == self.default_heading_text else self.heading_text,
+            "caps": self.is_caps,
+        })
+
+    def refresh_index(self):
+        self.search_worker.request_refresh()
+
+    def on_index_refreshed(self, changed):
+        self.dir_watcher.set_directories(self.font_index.directories())
+        if changed and self.search_mode and self.search_text:
+            self.start_search()
+
+    def on_directories_changed(self, paths):
+        rel_dirs = set()
+        for path in paths:
+            self.dir_cache.pop(path, None)
+            if path == self.root_path:
+                rel_dirs.add("")
+            elif path.startswith(self.root_path + os.sep):
+                rel_dirs.add(os.path.relpath(path, self.root_path))
+        if rel_dirs:
+            self.search_worker.request_refresh(rel_dirs)
+        if not self.search_mode and self.current_path in paths:
+            self.refresh_listing()
+
+    def closeEvent(self, event):
+        self.save_session()
+        tracing.export_on_exit()
+        if self.instance_server is not None:
+            self.instance_server.close()
+        self.install_checker.shutdown(wait=False, cancel_futures=True)
+        self.glyph_loader.shutdown(wait=False, cancel_futures=True)
+        self.instance_worker.shutdown(wait=False, cancel_futures=True)
+        self.prefetcher.shutdown()
+        self.dir_watcher.stop()
+        self.thumbnail_renderer.shutdown()
+        self.dir_scanner.stop()
+        self.search_worker.stop()
+        super().closeEvent(event)
+
+    def init_ui(self):
+        self.setWindowTitle("Linux Font Viewer")
+        self.resize(1200, 800)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+
+        # --- TOP BAR ---
+        top_bar = QWidget()
+        top_bar.setFixedHeight(50)
+        top_bar_layout = QHBoxLayout(top_bar)
+        top_bar_layout.setContentsMargins(10, 5, 10, 5)
+
+        self.btn_back = QPushButton("cd ..")
+        self.btn_back.setIcon(self.style().standardIcon(QStyle.SP_ArrowBack))
+        self.btn_back.clicked.connect(self.go_back)
+
+        self.btn_home = QPushButton("cd ~")
+        self.btn_home.setIcon(self.style().standardIcon(QStyle.SP_DirHomeIcon))
+        self.btn_home.clicked.connect(self.go_home)
+
+        self.address_bar = QLineEdit()
+        self.address_bar.setReadOnly(True)
+        self.address_bar.setText(self.current_path)
+
+        self.btn_install = QPushButton("Install Font")
+        self.btn_install.setEnabled(False)
+        self.btn_install.clicked.connect(self.install_font)
+
+        self.btn_install_selected = QPushButton("Install Selected")
+        self.btn_install_selected.setToolTip("Install the selected fonts and every font in the selected folders")
+        self.btn_install_selected.setEnabled(False)
+        self.btn_install_selected.clicked.connect(self.install_selected)
+
+        self.btn_duplicates = QPushButton("Find Duplicates")
+        self.btn_duplicates.clicked.connect(self.find_duplicates)
+
+        self.btn_wall = QPushButton("Specimen Wall")
+        self.btn_wall.setCheckable(True)
+        self.btn_wall.toggled.connect(self.toggle_wall)
+
+        self.btn_glyphs = QPushButton("Glyph Grid")
+        self.btn_glyphs.setCheckable(True)
+        self.btn_glyphs.toggled.connect(self.toggle_glyphs)
+
+        self.btn_compare = QPushButton("Compare")
+        self.btn_compare.setToolTip("Fonts pinned with \"Pin to Compare\", side by side")
+        self.btn_compare.setCheckable(True)
+        self.btn_compare.toggled.connect(self.toggle_compare)
+
+        top_bar_layout.addWidget(self.btn_back)
+        top_bar_layout.addWidget(self.btn_home)
+        top_bar_layout.addWidget(self.address_bar)
+        top_bar_layout.addWidget(self.btn_wall)
+        top_bar_layout.addWidget(self.btn_glyphs)
+        top_bar_layout.addWidget(self.btn_compare)
+        top_bar_layout.addWidget(self.btn_duplicates)
+        top_bar_layout.addWidget(self.btn_install_selected)
+        top_bar_layout.addWidget(self.btn_install)
+
+        # --- CONTENT AREA ---
+        content_splitter = QSplitter(Qt.Horizontal)
+
+        # 1. Sidebar Container
+        sidebar_container = QWidget()
+        sidebar_layout = QVBoxLayout(sidebar_container)
+        sidebar_layout.setContentsMargins(0, 0, 0, 0)
+        sidebar_layout.setSpacing(5)
+
+        # Style Selector
+        style_container = QWidget()
+        style_container.setFixedHeight(40)
+        style_layout = QHBoxLayout(style_container)
+        style_layout.setContentsMargins(5, 0, 5, 0)
+        style_label = QLabel("Style:")
+        style_label.setStyleSheet("color: #888; font-weight: bold;")
+        self.style_combo = QComboBox()
+        self.style_combo.addItem("No Font Selected")
+        self.style_combo.setEnabled(False)
+        self.style_combo.currentTextChanged.connect(self.on_style_changed)
+        style_layout.addWidget(style_label)
+        style_layout.addWidget(self.style_combo)
+
+        # Search Bar
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText("Search fonts...")
+        self.search_bar.setFixedHeight(30)
+        self.search_bar.textChanged.connect(self.handle_search)
+
+        # File List
+        self.file_model = FileListModel({
+            FileListModel.FLAG_DIR: self.style().standardIcon(QStyle.SP_DirIcon),
+            FileListModel.FLAG_FONT: self.style().standardIcon(QStyle.SP_FileIcon),
+            FileListModel.FLAG_FACE: self.style().standardIcon(QStyle.SP_FileLinkIcon),
+            FileListModel.FLAG_ARCHIVE: self.style().standardIcon(QStyle.SP_DirLinkIcon),
+        }, self)
+        self.file_list = QListView()
+        self.file_list.setModel(self.file_model)
+        self.file_list.setUniformItemSizes(True)
+        self.file_list.setEditTriggers(QListView.NoEditTriggers)
+        self.file_list.setSelectionMode(QListView.ExtendedSelection)
+        self.file_list.clicked.connect(self.on_item_clicked)
+        self.file_list.selectionModel().currentChanged.connect(self.on_current_changed)
+        QShortcut(QKeySequence(Qt.Key_Return), self.file_list, self.open_current_row,
+                  context=Qt.WidgetShortcut)
+        QShortcut(QKeySequence(Qt.Key_Enter), self.file_list, self.open_current_row,
+                  context=Qt.WidgetShortcut)
+        QShortcut(QKeySequence(Qt.Key_Backspace), self.file_list, self.go_back,
+                  context=Qt.WidgetShortcut)
+        self.file_list.selectionModel().selectionChanged.connect(self.on_selection_changed)
+        self.file_list.setMinimumWidth(200)
+        self.file_model.modelReset.connect(self.schedule_wall_refresh)
+        self.file_model.rowsInserted.connect(self.schedule_wall_refresh)
+        self.file_model.layoutChanged.connect(self.schedule_wall_refresh)
+
+        # Variable font axes, filled in by setup_axes()
+        self.axes_container = QWidget()
+        self.axes_layout = QGridLayout(self.axes_container)
+        self.axes_layout.setContentsMargins(5, 0, 5, 0)
+        self.axes_container.hide()
+
+        sidebar_layout.addWidget(style_container)
+        sidebar_layout.addWidget(self.axes_container)
+        sidebar_layout.addWidget(self.search_bar)
+        sidebar_layout.addWidget(self.file_list)
+
+        # 2. Canvas Area
+        right_container = QWidget()
+        right_layout = QGridLayout(right_container)
+        right_layout.setContentsMargins(0, 0, 0, 0)
+        right_layout.setSpacing(0)
+
+        # Main Canvas
+        self.canvas = QTextEdit()
+        self.canvas.setReadOnly(True)
+        self.canvas.setStyleSheet("""
+            QTextEdit {
+                background-color: #2d2d2d;
+                color: #FFFFFF;
+                border: none;
+                padding: 50px;
+            }
+        """)
+        right_layout.addWidget(self.canvas, 0, 0, 2, 2)
+
+        # Specimen Wall (replaces the canvas while shown)
+        self.wall = QListView()
+        self.wall.setViewMode(QListView.IconMode)
+        self.wall.setModel(self.wall_model)
+        self.wall.setIconSize(QSize(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT))
+        self.wall.setGridSize(QSize(THUMBNAIL_WIDTH + 16, THUMBNAIL_HEIGHT + 32))
+        self.wall.setUniformItemSizes(True)
+        self.wall.setResizeMode(QListView.Adjust)
+        self.wall.setMovement(QListView.Static)
+        self.wall.setEditTriggers(QListView.NoEditTriggers)
+        self.wall.setStyleSheet("QListView { background-color: #2d2d2d; border: none; }")
+        self.wall.clicked.connect(self.on_wall_clicked)
+        self.wall.hide()
+        self.thumbnail_renderer.is_wanted = self.is_wall_cell_visible
+        right_layout.addWidget(self.wall, 0, 0, 2, 2)
+
+        # Glyph Grid (replaces the canvas while shown)
+        self.glyph_panel = QWidget()
+        self.glyph_panel.setStyleSheet("background-color: #2d2d2d;")
+        glyph_layout = QVBoxLayout(self.glyph_panel)
+        glyph_layout.setContentsMargins(10, 10, 10, 0)
+        glyph_filter_row = QHBoxLayout()
+        glyph_filter_label = QLabel("Show:")
+        glyph_filter_label.setStyleSheet("color: #888; font-weight: bold;")
+        self.glyph_filter = QComboBox()
+        self.glyph_filter.setMinimumWidth(260)
+        self.glyph_filter.currentIndexChanged.connect(self.apply_glyph_filter)
+        self.glyph_count = QLabel("")
+        self.glyph_count.setStyleSheet("color: #888;")
+        glyph_filter_row.addWidget(glyph_filter_label)
+        glyph_filter_row.addWidget(self.glyph_filter)
+        glyph_filter_row.addWidget(self.glyph_count)
+        glyph_filter_row.addStretch(1)
+
+        self.glyph_model = GlyphGridModel(self)
+        self.glyph_delegate = GlyphDelegate(self)
+        self.glyph_view = QListView()
+        self.glyph_view.setViewMode(QListView.IconMode)
+        self.glyph_view.setModel(self.glyph_model)
+        self.glyph_view.setItemDelegate(self.glyph_delegate)
+        self.glyph_view.setGridSize(QSize(GLYPH_TILE_WIDTH + 4, GLYPH_TILE_HEIGHT + 4))
+        self.glyph_view.setUniformItemSizes(True)
+        self.glyph_view.setResizeMode(QListView.Adjust)
+        self.glyph_view.setMovement(QListView.Static)
+        self.glyph_view.setLayoutMode(QListView.Batched)
+        self.glyph_view.setBatchSize(2000)
+        self.glyph_view.setEditTriggers(QListView.NoEditTriggers)
+        self.glyph_view.setStyleSheet("QListView { background-color: #2d2d2d; border: none; }")
+        glyph_layout.addLayout(glyph_filter_row)
+        glyph_layout.addWidget(self.glyph_view)
+        self.glyph_panel.hide()
+        right_layout.addWidget(self.glyph_panel, 0, 0, 2, 2)
+
+        # Compare (replaces the canvas while shown)
+        self.compare_panel = QWidget()
+        self.compare_panel.setStyleSheet("background-color: #2d2d2d;")
+        compare_layout = QVBoxLayout(self.compare_panel)
+        compare_layout.setContentsMargins(10, 10, 10, 50)
+        compare_header = QHBoxLayout()
+        self.btn_compare_rows = QPushButton("Rows")
+        self.btn_compare_rows.setCheckable(True)
+        self.btn_compare_rows.setStyleSheet("padding: 5px; background-color: #444; color: white;")
+        self.btn_compare_rows.toggled.connect(self.set_compare_rows)
+        btn_compare_clear = QPushButton("Unpin All")
+        btn_compare_clear.setStyleSheet("padding: 5px; background-color: #444; color: white;")
+        btn_compare_clear.clicked.connect(self.unpin_all)
+        compare_header.addStretch(1)
+        compare_header.addWidget(self.btn_compare_rows)
+        compare_header.addWidget(btn_compare_clear)
+
+        self.compare_hint = QLabel("Pin fonts with \"Pin to Compare\" to see them side by side.")
+        self.compare_hint.setStyleSheet("color: #888;")
+        self.compare_hint.setAlignment(Qt.AlignCenter)
+        compare_container = QWidget()
+        self.compare_layout = QBoxLayout(QBoxLayout.LeftToRight, compare_container)
+        self.compare_layout.setContentsMargins(0, 0, 0, 0)
+        self.compare_layout.setSpacing(20)
+        self.compare_layout.addStretch(1)
+        self.compare_scroll = QScrollArea()
+        self.compare_scroll.setWidgetResizable(True)
+        self.compare_scroll.setStyleSheet("QScrollArea { border: none; }")
+        self.compare_scroll.setWidget(compare_container)
+        self.compare_scroll.verticalScrollBar().valueChanged.connect(self.schedule_compare_visible)
+        self.compare_scroll.horizontalScrollBar().valueChanged.connect(self.schedule_compare_visible)
+        compare_layout.addLayout(compare_header)
+        compare_layout.addWidget(self.compare_hint)
+        compare_layout.addWidget(self.compare_scroll, 1)
+        self.compare_panel.hide()
+        right_layout.addWidget(self.compare_panel, 0, 0, 2, 2)
+
+        # Overlay Buttons (Top Left)
+        overlay_container = QWidget()
+        overlay_layout = QHBoxLayout(overlay_container)
+        overlay_layout.setContentsMargins(10, 10, 0, 0) # Top, Left
+
+        btn_caps = QPushButton("Toggle Caps")
+        btn_caps.setStyleSheet("padding: 5px; background-color: #444; color: white;")
+        btn_caps.clicked.connect(self.toggle_caps)
+
+        btn_edit = QPushButton("Edit Text")
+        btn_edit.setStyleSheet("padding: 5px; background-color: #444; color: white;")
+        btn_edit.clicked.connect(self.edit_text)
+
+        btn_pin = QPushButton("Pin to Compare")
+        btn_pin.setStyleSheet("padding: 5px; background-color: #444; color: white;")
+        btn_pin.clicked.connect(self.pin_font)
+
+        overlay_layout.addWidget(btn_caps)
+        overlay_layout.addWidget(btn_edit)
+        overlay_layout.addWidget(btn_pin)
+
+        right_layout.addWidget(overlay_container, 0, 0, 1, 1, Qt.AlignTop | Qt.AlignLeft)
+
+        # Performance Overlay (Top Right, F12)
+        self.perf_overlay = PerformanceOverlay(self.performance_counters, right_container)
+        right_layout.addWidget(self.perf_overlay, 0, 0, 1, 2, Qt.AlignTop | Qt.AlignRight)
+        QShortcut(QKeySequence("F12"), self, self.toggle_overlay)
+        QShortcut(QKeySequence("Ctrl+F12"), self, self.export_trace)
+
+        # Zoom Slider (Bottom)
+        zoom_container = QWidget()
+        zoom_container.setFixedHeight(50)
+        zoom_container.setStyleSheet("background-color: #333; border-top: 1px solid #444;")
+        zoom_layout = QHBoxLayout(zoom_container)
+        zoom_layout.setContentsMargins(50, 5, 50, 5)
+
+        zoom_label = QLabel("Heading Zoom:")
+        zoom_label.setStyleSheet("color: white;")
+
+        self.zoom_slider = QSlider(Qt.Horizontal)
+        self.zoom_slider.setMinimum(50)
+        self.zoom_slider.setMaximum(200)
+        self.zoom_slider.setValue(self.zoom_level)
+        self.zoom_slider.valueChanged.connect(self.update_zoom)
+
+        zoom_layout.addWidget(zoom_label)
+        zoom_layout.addWidget(self.zoom_slider)
+
+        right_layout.addWidget(zoom_container, 1, 0, 1, 2)
+
+        content_splitter.addWidget(sidebar_container)
+        content_splitter.addWidget(right_container)
+        content_splitter.setStretchFactor(1, 4)
+
+        main_layout.addWidget(top_bar)
+        main_layout.addWidget(content_splitter)
+
+        self.apply_dark_theme()
+
+    # --- Performance Overlay ---
+    def toggle_overlay(self):
+        self.perf_overlay.set_active(not self.perf_overlay.isVisible())
+
+    def performance_counters(self):
+        fonts = self.font_cache.stats()
+        font_lookups = fonts["hits"] + fonts["misses"]
+        instances = self.instance_cache.stats()
+        instance_lookups = instances["hits"] + instances["misses"]
+        archive_stats = archives.stats()
+        preview_lookups = self.preview_cache.hits + self.preview_cache.misses
+        return {
+            "memory": {"rss_mb": round(tracing.rss_mb(), 1)},
+            "font_cache": {"fonts": fonts["fonts"], "mb": round(fonts["bytes"] / (1024 * 1024), 1),
+                           "hit_rate": round(fonts["hits"] / font_lookups, 2) if font_lookups else 0.0},
+            "preview_cache": {"docs": len(self.preview_cache),
+                              "hit_rate": round(self.preview_cache.hits / preview_lookups, 2)
+                              if preview_lookups else 0.0},
+            "dir_cache": {"dirs": len(self.dir_cache)},
+            "archive_cache": {"members": archive_stats["members"],
+                              "mb": round(archive_stats["bytes"] / (1024 * 1024), 1)},
+            "instance_cache": {"fonts": instances["fonts"],
+                               "hit_rate": round(instances["hits"] / instance_lookups, 2)
+                               if instance_lookups else 0.0},
+        }
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Trace",
+                                              os.path.expanduser("~/font-fragrance-trace.json"),
+                                              "Chrome Trace (*.json)")
+        if not path:
+            return
+        try:
+            tracing.export_chrome_trace(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Trace", f"Could not write the trace: {e}")
+
+    def apply_dark_theme(self):
+        app = QApplication.instance()
+        app.setStyle("Fusion")
+        palette = QPalette()
+        palette.setColor(QPalette.Window, QColor(53, 53, 53))
+        palette.setColor(QPalette.WindowText, Qt.white)
+        palette.setColor(QPalette.Base, QColor(25, 25, 25))
+        palette.setColor(QPalette.AlternateBase, QColor(53, 53, 53))
+        palette.setColor(QPalette.ToolTipBase, Qt.white)
+        palette.setColor(QPalette.ToolTipText, Qt.white)
+        palette.setColor(QPalette.Text, Qt.white)
+        palette.setColor(QPalette.Button, QColor(53, 53, 53))
+        palette.setColor(QPalette.ButtonText, Qt.white)
+        palette.setColor(QPalette.BrightText, Qt.red)
+        palette.setColor(QPalette.Link, QColor(42, 130, 218))
+        palette.setColor(QPalette.Highlight, QColor(42, 130, 218))
+        palette.setColor(QPalette.HighlightedText, Qt.black)
+        app.setPalette(palette)
+
+    def check_install_status(self):
+        if not self.selected_font_path:
+            self.btn_install.setEnabled(False)
+            self.btn_install.setText("Install Font")
+            return
+
+        self.btn_install.setEnabled(False)
+        self.btn_install.setText("Checking...")
+        self.btn_install.setToolTip("")
+        self.install_checker.submit(self._check_install_state, self.selected_font_path)
+
+    def _check_install_state(self, path):
+        # Runs on the install checker thread
+        try:
+            if time.monotonic() - self.install_index_time > INSTALL_REFRESH_INTERVAL_S:
+                self.install_index.refresh()
+                self.install_index_time = time.monotonic()
+            installed = self.install_index.find_installed(path)
+        except Exception as e:
+            print(f"Error checking install status: {e}")
+            installed = None
+        self.install_state_ready.emit(path, installed or "")
+
+    def on_install_state(self, path, installed):
+        if path != self.selected_font_path:
+            return
+        if installed:
+            self.btn_install.setEnabled(False)
+            self.btn_install.setText("Already Installed")
+            self.btn_install.setToolTip(installed)
+        else:
+            self.btn_install.setEnabled(self.install_worker is None)
+            self.btn_install.setText("Install Font")
+            self.btn_install.setToolTip("")
+
+    def find_duplicates(self):
+        self.btn_duplicates.setEnabled(False)
+        self.btn_duplicates.setText("Hashing...")
+        threading.Thread(target=self._find_duplicates, daemon=True).start()
+
+    def _find_duplicates(self):
+        try:
+            files = list(self.font_index.iter_files())
+            sizes = {path: size for path, size, _ in files}
+            groups = [[(path, sizes[path]) for path in group]
+                      for group in find_duplicates(files, self.hash_cache)]
+        except Exception as e:
+            print(f"Error finding duplicates: {e}")
+            groups = []
+        self.duplicates_found.emit(groups)
+
+    def on_duplicates_found(self, groups):
+        self.btn_duplicates.setEnabled(True)
+        self.btn_duplicates.setText("Find Duplicates")
+        if not groups:
+            QMessageBox.information(self, "Duplicate Fonts", "No duplicate fonts found.")
+            return
+        DuplicatesDialog(groups, self.root_path, self).exec_()
+
+    def load_directory(self, path):
+        requested_path = os.path.normpath(path)
+
+        if not requested_path.startswith(self.root_path):
+            # We only enforce this for manual navigation.
+            # Opening via sys.argv bypasses this.
+            QMessageBox.warning(self, "Access Denied", "Cannot navigate outside the font collection.")
+            return
+
+        self.current_path = requested_path
+        self.address_bar.setText(self.current_path)
+        self.search_mode = False
+        self.restore_row = None
+        self.btn_install.setEnabled(False)
+        self.btn_install.setText("Install Font")
+
+        self.style_combo.blockSignals(True)
+        self.style_combo.clear()
+        self.style_combo.addItem("No Font Selected")
+        self.style_combo.setEnabled(False)
+        self.style_combo.blockSignals(False)
+
+        self.current_font_family = None
+        self.clear_canvas()
+        self.list_directory()
+
+    def list_directory(self):
+        # Fills the sidebar with the current directory, leaving the preview alone
+        self.file_model.clear()
+
+        # A directory that has not changed since it was last listed costs one stat
+        try:
+            mtime = archives.getmtime(self.current_path)
+        except OSError:
+            mtime = None
+        cached = self.dir_cache.get(self.current_path)
+        if cached is not None and cached[0] == mtime:
+            self.dir_cache.move_to_end(self.current_path)
+            self.scan_generation = 0
+            self.dir_scanner.cancel()
+            self.file_model.set_entries(cached[1], cached[2])
+            self.restore_scroll()
+            return
+
+        self.scan_buffer = None
+        self.scan_generation = self.dir_scanner.scan(self.current_path)
+
+    def refresh_listing(self):
+        # Lists the current directory again without touching the preview; the
+        # new entries replace the old ones in one go once the scan is done
+        self.scan_buffer = ([], array("B"))
+        self.scan_generation = self.dir_scanner.scan(self.current_path)
+
+    def on_dir_entries(self, generation, names, flags):
+        if generation != self.scan_generation:
+            return
+        if self.scan_buffer is not None:
+            self.scan_buffer[0].extend(names)
+            self.scan_buffer[1].extend(flags)
+            return
+        self.file_model.append_entries(names, flags)
+
+    def on_dir_scanned(self, generation, path, mtime, error):
+        if generation != self.scan_generation:
+            return
+        buffered = self.scan_buffer
+        self.scan_buffer = None
+        if error:
+            self.file_model.set_entries([f"[{error}]"], [FileListModel.FLAG_ERROR])
+            return
+
+        if buffered is not None:
+            self.file_model.set_entries(*buffered)
+        self.file_model.sort()
+        names, flags = self.file_model.snapshot()
+        self.dir_cache[path] = (mtime, names, flags)
+        self.dir_cache.move_to_end(path)
+        while len(self.dir_cache) > DIR_CACHE_SIZE:
+            self.dir_cache.popitem(last=False)
+        self.restore_scroll()
+
+    def restore_scroll(self):
+        # The first listing after startup scrolls back to where the last session was
+        row = self.restore_row
+        self.restore_row = None
+        if isinstance(row, int) and 0 <= row < self.file_model.rowCount():
+            self.file_list.scrollTo(self.file_model.index(row), QListView.PositionAtTop)
+
+    def handle_search(self, text):
+        self.search_text = text
+        if not text:
+            self.search_timer.stop()
+            self.search_worker.cancel()
+            self.load_directory(self.current_path)
+            return
+
+        # Debounced: the query only starts once typing pauses
+        self.search_timer.start()
+
+    def start_search(self):
+        self.scan_generation = 0
+        self.dir_scanner.cancel()
+        self.search_mode = True
+        self.file_model.clear()
+        self.address_bar.setText(f"Searching: {self.search_text}")
+        self.search_generation = self.search_worker.submit(self.search_text)
+
+    def on_search_results(self, generation, rows):
+        if generation != self.search_generation:
+            return
+
+        names = [file for file, _ in rows]
+        paths = [rel_path for _, rel_path in rows]
+        self.file_model.append_entries(names, [FileListModel.FLAG_FONT] * len(rows), paths)
+
+    def on_search_finished(self, generation, count):
+        if generation != self.search_generation:
+            return
+        if count >= SearchWorker.MAX_RESULTS:
+            self.address_bar.setText(f"Search: {self.search_text} (best {count} shown)")
+        else:
+            self.address_bar.setText(f"Search: {self.search_text} ({count} found)")
+
+    def on_style_changed(self, style_name):
+        if self.current_font_family and style_name != "No Font Selected":
+            # A named instance replaces whatever the axis sliders were showing
+            self.variation_face = None
+            self.reset_axes(style_name)
+            self.display_font(self.current_font_family, style_name)
+
+    def row_path(self, row):
+        # The listing already knows what each entry is, so nothing is stat'ed here
+        if self.search_mode or self.file_model.flags_at(row) & FileListModel.FLAG_FACE:
+            return os.path.join(self.root_path, self.file_model.path(row))
+        return os.path.join(self.current_path, self.file_model.name(row))
+
+    def on_item_clicked(self, index):
+        row = index.row()
+        flags = self.file_model.flags_at(row)
+        item_path = self.row_path(row)
+
+        if flags & (FileListModel.FLAG_DIR | FileListModel.FLAG_ARCHIVE):
+            self.load_directory(item_path)
+        elif flags & (FileListModel.FLAG_FONT | FileListModel.FLAG_FACE):
+            # Usually already shown by on_current_changed() on mouse press
+            self.preview_row(row)
+            if item_path.lower().endswith(COLLECTION_EXTENSIONS):
+                self.toggle_faces(row, item_path)
+
+    def open_current_row(self):
+        index = self.file_list.currentIndex()
+        if index.isValid():
+            self.on_item_clicked(index)
+
+    def on_current_changed(self, current, previous):
+        # Arrow keys, Page Up/Down and clicks all move the current row; fonts are
+        # previewed right away, folders only open on click or Enter
+        if not current.isValid():
+            self.current_row = -1
+            return
+        row = current.row()
+        step = 1 if row >= self.current_row else -1
+        self.current_row = row
+        if self.file_model.flags_at(row) & (FileListModel.FLAG_FONT | FileListModel.FLAG_FACE):
+            self.preview_row(row)
+        self.prefetch_around(row, step)
+
+    def preview_row(self, row):
+        path = self.row_path(row)
+        face = self.file_model.face(row) if self.file_model.flags_at(row) & FileListModel.FLAG_FACE else None
+        if path == self.selected_font_path and (face or 0) == self.selected_face:
+            return
+        self.load_font_file(path, face=face)
+
+    def prefetch_around(self, row, step):
+        # Single fonts only; collections are loaded face by face on demand
+        rows = [row + step * i for i in range(1, PREFETCH_AHEAD + 1)]
+        rows += [row - step * i for i in range(1, PREFETCH_BEHIND + 1)]
+        paths = []
+        for r in rows:
+            if not 0 <= r < self.file_model.rowCount() or not self.file_model.flags_at(r) & FileListModel.FLAG_FONT:
+                continue
+            path = self.row_path(r)
+            if not path.lower().endswith(COLLECTION_EXTENSIONS):
+                paths.append(path)
+        self.prefetch_queue.clear()
+        # Fonts that are registered already only need their document
+        self.prefetch_queue.extend((path, None, None) for path in paths if self.font_cache.has_path(path))
+        if self.prefetch_queue:
+            self.prefetch_timer.start()
+        self.prefetcher.request([path for path in paths if not self.font_cache.has_path(path)])
+
+    def on_font_prefetched(self, generation, path, mtime, data):
+        if generation != self.prefetcher.generation:
+            return
+        self.prefetch_queue.append((path, mtime, data))
+        self.prefetch_timer.start()
+
+    def prefetch_step(self):
+        # Registers one prefetched font and builds its specimen, the way
+        # load_font_file() would show it
+        if not self.prefetch_queue:
+            return
+        path, mtime, data = self.prefetch_queue.popleft()
+        try:
+            with tracing.span("prefetch_font", path=path):
+                if data is None:
+                    font_id, families = self.font_cache.load(path)
+                else:
+                    font_id, families = self.font_cache.load_data((path, mtime), data)
+                if font_id != -1 and families:
+                    styles = QFontDatabase().styles(families[0]) or ["Regular"]
+                    specimen = self.preview_cache.get(families[0], styles[0], self.heading_text,
+                                                      self.is_caps, self.zoom_level)
+                    specimen.doc.setTextWidth(self.canvas.viewport().width())
+                    specimen.doc.size()
+        except OSError as e:
+            print(f"Error prefetching font: {e}")
+        if self.prefetch_queue:
+            self.prefetch_timer.start()
+
+    def toggle_faces(self, row, path):
+        # A collection expands into its faces on the first click, collapses on the next
+        if self.file_model.remove_faces(row):
+            return
+        try:
+            with tracing.span("list_faces", path=path) as span:
+                faces = read_faces(path)
+                span.set(count=len(faces))
+        except (OSError, FontFormatError) as e:
+            print(f"Error listing font collection: {e}")
+            return
+        names = [f"    {family} {subfamily}".rstrip() for family, subfamily in faces]
+        self.file_model.insert_faces(row, names, os.path.relpath(path, self.root_path))
+
+    def load_font_file(self, path, style=None, face=None):
+        # face picks one face of a collection, the first one by default
+        if face is None and path.lower().endswith(COLLECTION_EXTENSIONS):
+            face = 0
+        try:
+            # If the file is external (via sys.argv), update the address bar for clarity
+            if not path.startswith(self.root_path):
+                self.address_bar.setText(f"Viewing: {path}")
+
+            font_db = QFontDatabase()
+            try:
+                if face is None:
+                    font_id, families = self.font_cache.load(path)
+                else:
+                    font_id, families = self.font_cache.load_face(path, face)
+            except (OSError, FontFormatError) as e:
+                print(f"Error loading font: {e}")
+                font_id, families = -1, []
+
+            if font_id == -1:
+                QMessageBox.warning(self, "Error", "Could not load font file.")
+                return
+
+            if not families:
+                return
+
+            self.current_font_family = families[0]
+            self.selected_font_path = path
+            self.selected_face = face or 0
+
+            self.check_install_status()
+
+            try:
+                styles = font_db.styles(self.current_font_family)
+            except:
+                styles = ["Regular"]
+
+            if not styles:
+                styles = ["Regular"]
+
+            if style not in styles:
+                style = styles[0]
+
+            self.style_combo.blockSignals(True)
+            self.style_combo.clear()
+            self.style_combo.addItems(styles)
+            self.style_combo.setCurrentText(style)
+            self.style_combo.setEnabled(True)
+            self.style_combo.blockSignals(False)
+
+            self.variation_face = None
+            self.setup_axes(path, self.selected_face, style)
+            self.display_font(self.current_font_family, style)
+
+        except Exception as e:
+            print(f"Error loading font: {e}")
+
+    def update_zoom(self):
+        self.zoom_level = self.zoom_slider.value()
+        if not self.zoom_timer.isActive():
+            self.zoom_timer.start()
+
+    def apply_zoom(self):
+        self.refresh_compare()
+        if self.current_font_family:
+            style = self.style_combo.currentText()
+            if style != "No Font Selected":
+                self.display_font(self.current_font_family, style)
+
+    # --- Variable Font Axes ---
+    def setup_axes(self, path, face, style):
+        # One slider per visible fvar axis of the selected font
+        while self.axes_layout.count():
+            self.axes_layout.takeAt(0).widget().deleteLater()
+        self.axis_sliders = []
+        try:
+            self.axes, self.instances = read_axes(path, face)
+        except (OSError, FontFormatError) as e:
+            print(f"Error reading font axes: {e}")
+            self.axes, self.instances = [], []
+        self.axes = [axis for axis in self.axes if not axis["hidden"]]
+
+        for row, axis in enumerate(self.axes):
+            scale = variations.axis_scale(axis)
+            label = QLabel(axis["name"])
+            label.setStyleSheet("color: #888;")
+            value_label = QLabel()
+            value_label.setMinimumWidth(40)
+            slider = QSlider(Qt.Horizontal)
+            slider.setRange(round(axis["min"] * scale), round(axis["max"] * scale))
+            slider.valueChanged.connect(lambda value, row=row: self.on_axis_moved(row, value))
+            if not variations.available():
+                slider.setEnabled(False)
+                slider.setToolTip("Install fontTools to explore the axes of variable fonts")
+            self.axes_layout.addWidget(label, row, 0)
+            self.axes_layout.addWidget(slider, row, 1)
+            self.axes_layout.addWidget(value_label, row, 2)
+            self.axis_sliders.append((slider, value_label, scale))
+        self.axes_container.setVisible(bool(self.axes))
+        self.reset_axes(style)
+
+    def reset_axes(self, style):
+        # Moves the sliders to the named instance shown in the style combo
+        coords = {}
+        for instance in self.instances:
+            if instance["name"] == style:
+                coords = instance["coords"]
+                break
+        for axis, (slider, value_label, scale) in zip(self.axes, self.axis_sliders):
+            value = coords.get(axis["tag"], axis["default"])
+            slider.blockSignals(True)
+            slider.setValue(round(value * scale))
+            slider.blockSignals(False)
+            value_label.setText(f"{slider.value() / scale:g}")
+
+    def on_axis_moved(self, row, value):
+        slider, value_label, scale = self.axis_sliders[row]
+        value_label.setText(f"{value / scale:g}")
+        if not self.variation_timer.isActive():
+            self.variation_timer.start()
+
+    def variation_text(self):
+        # The characters an instance needs to show the specimen in either case
+        return self.heading_text + self.heading_text.upper() + SPECIMEN_BODY + SPECIMEN_ENDING
+
+    def apply_variation(self):
+        if not self.axis_sliders or not self.selected_font_path:
+            return
+        coords = tuple((axis["tag"], slider.value() / scale)
+                       for axis, (slider, _, scale) in zip(self.axes, self.axis_sliders))
+        path = self.selected_font_path
+        face = self.selected_face
+        text = self.variation_text()
+        try:
+            key = ((path, face, text, coords), archives.getmtime(path))
+        except OSError as e:
+            print(f"Error building font instance: {e}")
+            return
+
+        entry = self.instance_cache.lookup(key)
+        if entry is not None:
+            self.show_instance(entry[1])
+            return
+        if self.instance_building or key == self.failed_instance:
+            # The newest position is picked up once the current build is done
+            return
+        self.instance_building = True
+        self.instance_serial += 1
+        family = f"{self.current_font_family} Instance {self.instance_serial}"
+        self.instance_worker.submit(self._build_instance, key, path, face, text, dict(coords), family)
+
+    def _build_instance(self, key, path, face, text, coords, family):
+        # Runs on the instance worker thread
+        try:
+            with tracing.span("build_instance", path=path, coords=coords) as span:
+                data = self.instance_builder.build(path, face, text, coords, family)
+                span.set(bytes=len(data))
+        except Exception as e:
+            print(f"Error building font instance: {e}")
+            data = None
+        self.instance_ready.emit(key, data)
+
+    def on_instance_ready(self, key, data):
+        self.instance_building = False
+        if key[0][:2] != (self.selected_font_path, self.selected_face):
+            # Built for a font no longer shown; the new one's sliders may have
+            # moved while this build held the worker
+            self.apply_variation()
+            return
+        font_id = self.instance_cache.load_data(key, data)[0] if data is not None else -1
+        if font_id == -1:
+            self.failed_instance = key
+        # Shows this instance, or starts on the position the sliders moved to meanwhile
+        self.apply_variation()
+
+    def show_instance(self, families):
+        if not families:
+            return
+        styles = QFontDatabase().styles(families[0])
+        self.variation_face = (families[0], styles[0] if styles else "Regular")
+        self.display_font(self.current_font_family, self.style_combo.currentText())
+
+    def update_canvas_visibility(self):
+        # The wall, the glyph grid and compare mode each take the canvas's place
+        self.canvas.setVisible(not (self.btn_wall.isChecked() or self.btn_glyphs.isChecked()
+                                    or self.btn_compare.isChecked()))
+
+    # --- Specimen Wall ---
+    def toggle_wall(self, checked):
+        if checked:
+            self.btn_glyphs.setChecked(False)
+            self.btn_compare.setChecked(False)
+        self.wall.setVisible(checked)
+        self.update_canvas_visibility()
+        if checked:
+            self.refresh_wall()
+        else:
+            self.thumbnail_renderer.clear_pending()
+
+    def schedule_wall_refresh(self):
+        if self.wall.isVisible():
+            self.wall_timer.start()
+
+    def wall_text(self):
+        return self.heading_text.upper() if self.is_caps else self.heading_text
+
+    def refresh_wall(self):
+        names = []
+        paths = []
+        model = self.file_model
+        for row in range(model.rowCount()):
+            if not model.flags_at(row) & FileListModel.FLAG_FONT:
+                continue
+            names.append(model.name(row))
+            if self.search_mode:
+                paths.append(os.path.join(self.root_path, model.path(row)))
+            else:
+                paths.append(os.path.join(self.current_path, model.name(row)))
+        self.thumbnail_renderer.set_text(self.wall_text())
+        self.wall_model.set_entries(names, paths)
+
+    def refresh_wall_text(self):
+        if self.wall.isVisible() and self.thumbnail_renderer.text != self.wall_text():
+            self.thumbnail_renderer.set_text(self.wall_text())
+            self.wall_model.reset_thumbnails()
+
+    def is_wall_cell_visible(self, path):
+        row = self.wall_model.row_of(path)
+        if row < 0 or not self.wall.isVisible():
+            return False
+        # One screen of margin, so cells just about to scroll in are rendered too
+        viewport = self.wall.viewport().rect()
+        margin = viewport.height()
+        return self.wall.visualRect(self.wall_model.index(row)).intersects(
+            viewport.adjusted(0, -margin, 0, margin))
+
+    def on_wall_clicked(self, index):
+        path = self.wall_model.path(index.row())
+        self.btn_wall.setChecked(False)
+        self.load_font_file(path)
+
+    # --- Glyph Grid ---
+    def toggle_glyphs(self, checked):
+        if checked:
+            self.btn_wall.setChecked(False)
+            self.btn_compare.setChecked(False)
+        self.glyph_panel.setVisible(checked)
+        self.update_canvas_visibility()
+        if checked:
+            self.load_glyphs()
+
+    def load_glyphs(self):
+        # Shows the selected font's codepoints; the cmap is only read again when
+        # the font file changes, a style change just switches the tile font
+        if not self.current_font_family or not self.selected_font_path:
+            self.glyph_source = None
+            self.glyph_model.set_codepoints(array("I"))
+            self.glyph_count.setText("No Font Selected")
+            return
+        try:
+            mtime = archives.getmtime(self.selected_font_path)
+        except OSError:
+            mtime = 0
+        source = (self.selected_font_path, self.selected_face, mtime)
+        self.glyph_delegate.set_font(self.current_font_family, self.style_combo.currentText(), source)
+        if self.glyph_source == source:
+            self.glyph_view.viewport().update()
+            return
+        self.glyph_source = source
+        self.glyph_count.setText("Reading cmap...")
+        self.glyph_loader.submit(self._read_glyphs, source)
+
+    def _read_glyphs(self, source):
+        # Runs on the glyph loader thread
+        path, face, _ = source
+        try:
+            with tracing.span("read_cmap", path=path, face=face) as span:
+                codepoints = read_codepoints(path, face)
+                span.set(count=len(codepoints))
+        except (OSError, FontFormatError) as e:
+            print(f"Error reading glyphs: {e}")
+            self.glyphs_ready.emit(source, str(e))
+            return
+        self.glyphs_ready.emit(source, codepoints)
+
+    def on_glyphs_ready(self, source, result):
+        if source != self.glyph_source:
+            return
+        if isinstance(result, str):
+            self.glyph_codepoints = array("I")
+            self.glyph_blocks = []
+            self.glyph_count.setText(f"Could not read the cmap: {result}")
+        else:
+            self.glyph_codepoints = array("I", result)
+            self.glyph_blocks = block_ranges(self.glyph_codepoints)
+
+        # Scripts first, then blocks; the previous choice is kept if this font has it
+        previous = self.glyph_filter.currentData()
+        scripts = {}
+        for block, script, start, end in self.glyph_blocks:
+            scripts[script] = scripts.get(script, 0) + end - start
+        self.glyph_filter.blockSignals(True)
+        self.glyph_filter.clear()
+        self.glyph_filter.addItem(f"All ({len(self.glyph_codepoints)})", None)
+        for script, count in sorted(scripts.items()):
+            self.glyph_filter.addItem(f"{script} ({count})", ("script", script))
+        for block, script, start, end in self.glyph_blocks:
+            self.glyph_filter.addItem(f"    {block} ({end - start})", ("block", block))
+        index = self.glyph_filter.findData(previous)
+        self.glyph_filter.setCurrentIndex(max(index, 0))
+        self.glyph_filter.blockSignals(False)
+        self.apply_glyph_filter()
+
+    def apply_glyph_filter(self):
+        choice = self.glyph_filter.currentData()
+        if choice is None:
+            codepoints = self.glyph_codepoints
+        else:
+            kind, name = choice
+            codepoints = array("I")
+            for block, script, start, end in self.glyph_blocks:
+                if (block if kind == "block" else script) == name:
+                    codepoints.extend(self.glyph_codepoints[start:end])
+        self.glyph_model.set_codepoints(codepoints)
+        self.glyph_count.setText(f"{len(codepoints)} glyphs")
+
+    def toggle_caps(self):
+        self.is_caps = not self.is_caps
+        self.refresh_wall_text()
+        self.refresh_compare()
+        if self.current_font_family:
+            style = self.style_combo.currentText()
+            if style != "No Font Selected":
+                self.display_font(self.current_font_family, style)
+
+    def edit_text(self):
+        dialog = EditTextDialog(self.heading_text, self)
+        if dialog.exec_() == QDialog.Accepted:
+            result = dialog.get_text()
+            if result is None:
+                self.heading_text = self.default_heading_text
+            else:
+                self.heading_text = result
+
+            self.refresh_wall_text()
+            self.refresh_compare()
+            if self.variation_face is not None:
+                # The instance only has the characters of the old heading
+                self.variation_timer.start()
+            if self.current_font_family:
+                style = self.style_combo.currentText()
+                if style != "No Font Selected":
+                    self.display_font(self.current_font_family, style)
+
+    # --- Compare ---
+    def toggle_compare(self, checked):
+        if checked:
+            self.btn_wall.setChecked(False)
+            self.btn_glyphs.setChecked(False)
+        self.compare_panel.setVisible(checked)
+        self.update_canvas_visibility()
+        if checked and self.compare_pending:
+            self.compare_timer.start()
+
+    def pin_font(self):
+        # Pins the font and style on the canvas as a new pane
+        if not self.current_font_family:
+            return
+        path = self.selected_font_path
+        face = self.selected_face if path.lower().endswith(COLLECTION_EXTENSIONS) else None
+        style = self.style_combo.currentText()
+        if not any((p.path, p.face, p.style) == (path, face, style) for p in self.compare_panes):
+            if len(self.compare_panes) >= COMPARE_MAX_PANES:
+                QMessageBox.information(self, "Compare", f"Up to {COMPARE_MAX_PANES} fonts can be "
+                                        "compared at once, unpin one first.")
+                return
+            pane = ComparePane(path, face, self.current_font_family, style)
+            pane.unpinned.connect(self.unpin_font)
+            pane.set_columns(not self.btn_compare_rows.isChecked())
+            self.compare_layout.insertWidget(len(self.compare_panes), pane)
+            self.compare_panes.append(pane)
+            self.compare_hint.hide()
+            self.schedule_compare([pane])
+        self.btn_compare.setChecked(True)
+
+    def unpin_font(self, pane):
+        self.compare_panes.remove(pane)
+        if pane in self.compare_pending:
+            self.compare_pending.remove(pane)
+        self.compare_layout.removeWidget(pane)
+        pane.deleteLater()
+        self.compare_hint.setVisible(not self.compare_panes)
+
+    def unpin_all(self):
+        for pane in list(self.compare_panes):
+            self.unpin_font(pane)
+
+    def set_compare_rows(self, rows):
+        # Rows span the panel's width, columns have a fixed width and scroll sideways
+        self.compare_layout.setDirection(QBoxLayout.TopToBottom if rows else QBoxLayout.LeftToRight)
+        for pane in self.compare_panes:
+            pane.set_columns(not rows)
+
+    def refresh_compare(self):
+        # After a heading, caps or zoom change; panes that are up to date cost nothing
+        self.schedule_compare(self.compare_panes)
+
+    def schedule_compare(self, panes):
+        for pane in panes:
+            if pane not in self.compare_pending:
+                self.compare_pending.append(pane)
+        if self.compare_pending and self.compare_panel.isVisible():
+            self.compare_timer.start()
+
+    def schedule_compare_visible(self):
+        # Scrolling may bring a pane that is still waiting to the front
+        if self.compare_pending:
+            self.compare_timer.start()
+
+    def compare_step(self):
+        # Hidden panes are caught up once compare mode is shown again
+        if not self.compare_pending or not self.compare_panel.isVisible():
+            return
+        pane = next((p for p in self.compare_pending if not p.visibleRegion().isEmpty()),
+                    self.compare_pending[0])
+        self.compare_pending.remove(pane)
+        self.update_pane(pane)
+        if self.compare_pending:
+            self.compare_timer.start()
+
+    def update_pane(self, pane):
+        text_key = (self.heading_text, self.is_caps)
+        try:
+            with tracing.span("compare_pane", family=pane.family, style=pane.style):
+                if pane.specimen is None or pane.text_key != text_key:
+                    # Also keeps the pinned font registered, or registers it again
+                    if pane.face is None:
+                        font_id, families = self.font_cache.load(pane.path)
+                    else:
+                        font_id, families = self.font_cache.load_face(pane.path, pane.face)
+                    if font_id == -1 or not families:
+                        return
+                    pane.family = families[0]
+                    heading = self.heading_text.upper() if self.is_caps else self.heading_text
+                    pane.set_specimen(SpecimenDocument(pane.family, pane.style, heading,
+                                                       self.zoom_level, pane), text_key)
+                elif pane.specimen.zoom != self.zoom_level:
+                    pane.specimen.set_zoom(self.zoom_level)
+                    pane.view.relayout()
+        except (OSError, FontFormatError) as e:
+            print(f"Error loading font: {e}")
+
+    def on_fonts_released(self, families):
+        self.preview_cache.discard_families(families)
+        stale = [pane for pane in self.compare_panes if pane.family in families]
+        for pane in stale:
+            pane.text_key = None
+        self.schedule_compare(stale)
+
+    def display_font(self, family, style):
+        # While the axis sliders are in use, the canvas shows their instance
+        if self.variation_face is not None and family == self.current_font_family:
+            family, style = self.variation_face
+        try:
+            # Setting the document on the canvas lays it out, so the span covers layout
+            with tracing.span("display_font", family=family, style=style, zoom=self.zoom_level):
+                specimen = self.preview_cache.get(family, style, self.heading_text,
+                                                  self.is_caps, self.zoom_level)
+                if self.canvas.document() is not specimen.doc:
+                    self.canvas.setDocument(specimen.doc)
+            if self.btn_glyphs.isChecked():
+                self.load_glyphs()
+
+        except Exception as e:
+            print(f"Error rendering font: {e}")
+            self.clear_canvas()
+            self.canvas.setHtml(f"<div style='color:white;'>Error rendering: {str(e)}</div>")
+
+    def clear_canvas(self):
+        # Cached specimen documents must never be edited, so the canvas gets a
+        # fresh document instead of being cleared in place
+        self.canvas.setDocument(QTextDocument(self.canvas))
+
+    def go_back(self):
+        parent = os.path.dirname(self.current_path)
+        if parent.startswith(self.root_path) or os.path.normpath(parent) == os.path.dirname(self.root_path):
+             # A folder inside an archive only exists in the archive's listing
+             if os.path.exists(parent) or archives.split(parent):
+                 self.load_directory(parent)
+
+    def go_home(self):
+        self.load_directory(self.root_path)
+
+    def install_font(self):
+        if not self.selected_font_path:
+            return
+        self.install_fonts([self.selected_font_path])
+
+    def selected_sources(self):
+        sources = []
+        for index in self.file_list.selectionModel().selectedRows():
+            row = index.row()
+            flags = self.file_model.flags_at(row)
+            if flags & FileListModel.FLAG_FACE:
+                continue
+            if self.search_mode:
+                sources.append(os.path.join(self.root_path, self.file_model.path(row)))
+            elif flags & (FileListModel.FLAG_DIR | FileListModel.FLAG_FONT | FileListModel.FLAG_ARCHIVE):
+                sources.append(os.path.join(self.current_path, self.file_model.name(row)))
+        return sources
+
+    def on_selection_changed(self):
+        self.btn_install_selected.setEnabled(
+            self.install_worker is None and bool(self.file_list.selectionModel().selectedRows()))
+
+    def install_selected(self):
+        sources = self.selected_sources()
+        if sources:
+            self.install_fonts(sources)
+
+    def install_fonts(self, sources):
+        if self.install_worker is not None:
+            return
+
+        password, ok = QInputDialog.getText(self, "Install Font", "Enter sudo password:", QLineEdit.Password)
+
+        if ok and password:
+            self.install_progress = QProgressDialog("Collecting fonts...", None, 0, 0, self)
+            self.install_progress.setWindowTitle("Processing")
+            self.install_progress.setWindowModality(Qt.WindowModal)
+            self.install_progress.setMinimumDuration(0)
+            self.install_progress.show()
+
+            self.install_worker = InstallWorker(sources, SYSTEM_FONT_PATH, password,
+                                                self.install_index, self)
+            self.install_worker.progress.connect(self.on_install_progress)
+            self.install_worker.install_finished.connect(self.on_install_finished)
+            self.btn_install.setEnabled(False)
+            self.btn_install_selected.setEnabled(False)
+            self.install_worker.start()
+
+    def on_install_progress(self, done, total, name):
+        self.install_progress.setMaximum(total)
+        self.install_progress.setValue(done)
+        if name:
+            self.install_progress.setLabelText(f"Installing {name} ({done}/{total})")
+        else:
+            self.install_progress.setLabelText(f"Installing {total} font(s)...")
+
+    def on_install_finished(self, installed, skipped, error):
+        self.install_progress.close()
+        self.install_worker.wait()
+        self.install_worker = None
+        self.install_index_time = 0
+        self.check_install_status()
+        self.on_selection_changed()
+
+        summary = f"{installed} font(s) installed."
+        if skipped:
+            summary += f"\n{skipped} already installed or name taken, skipped."
+        if error:
+            QMessageBox.critical(self, "Installation Failed", f"{summary}\n\n{error}")
+        else:
+            QMessageBox.information(self, "Success", summary)
+
+def main(argv):
+    app = QApplication(argv)
+    viewer = FontViewerApp()
+    viewer.show()
+    return app.exec_()